@@ -1,54 +1,57 @@
+import argparse
+import asyncio
+import importlib
+import json
 import os
 import sys
-try:
-    import requests
-except ImportError:
-    print("[!] Missing library: requests")
-    c = input("Install requests now? (yes/no): ").lower()
-    if c == "yes":
-        os.system("sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq python3-requests")
-        print("[+] Installed. Restart the tool.")
-        sys.exit(0)
-    else:
-        print("[-] Cannot continue without requests.")
-        sys.exit(1)
-import os
-import sys
-import requests
 import shutil
+import threading
+import time
+
+import shark_dirs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UPDATE_URL = "https://raw.githubusercontent.com/oppoornose-jpg/SharkBuster/main/version.txt"
+UPDATE_TTL = 24 * 3600
+
+GREEN   = "\033[92m"
+CYAN    = "\033[96m"
+YELLOW  = "\033[93m"
+RED     = "\033[91m"
+RESET   = "\033[0m"
+
+
+def config_path():
+    return shark_dirs.config_dir("config.json")
+
+
 def cd_to_sharkbuster():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
+    base_dir = HERE
     if not os.path.isdir(base_dir):
         print("[!] SharkBuster directory not found")
         sys.exit(1)
     os.chdir(base_dir)
-cd_to_sharkbuster()
+
+
 def customize():
     os.system("clear")
-    
-customize()
-def install_kali_menu():
-    
 
+
+def install_kali_menu():
+    # only writes (and restarts the panel) when the entry is missing or
+    # points somewhere else, not on every start
     home = os.path.expanduser("~")
     app_dir = os.path.join(home, ".local/share/applications")
     icon_dir = os.path.join(home, ".local/share/icons")
 
-    os.makedirs(app_dir, exist_ok=True)
-    os.makedirs(icon_dir, exist_ok=True)
-
     desktop_path = os.path.join(app_dir, "sharkbuster-web.desktop")
     icon_target = os.path.join(icon_dir, "sharkbuster-web.png")
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    icon_source = os.path.join(script_dir, "image.png")
+    icon_source = os.path.join(HERE, "image.png")
 
     if not os.path.isfile(icon_source):
         print("Icon image.png not found")
         return
 
-    shutil.copy(icon_source, icon_target)
-
     desktop_entry = f"""[Desktop Entry]
 Name=SharkBuster Web
 Comment=Web Recon Tool
@@ -58,105 +61,315 @@ Terminal=true
 Type=Application
 Categories=Multi-Tool Suite;
 """
+    try:
+        with open(desktop_path) as f:
+            if f.read() == desktop_entry and os.path.isfile(icon_target):
+                return
+    except OSError:
+        pass
 
+    os.makedirs(app_dir, exist_ok=True)
+    os.makedirs(icon_dir, exist_ok=True)
+    shutil.copy(icon_source, icon_target)
     with open(desktop_path, "w") as f:
         f.write(desktop_entry)
 
     os.system("update-desktop-database ~/.local/share/applications")
     os.system("xfce4-panel -r")
-install_kali_menu()
-        
 
-if os.path.isfile("version.txt"):
-    with open("version.txt", "r") as f:
-        V = f.read().strip()
-else:
-    V = "9.5.3"
 
+def local_version():
+    path = os.path.join(HERE, "version.txt")
+    if os.path.isfile(path):
+        with open(path, "r") as f:
+            return f.read().strip()
+    return "9.5.3"
 
-def check_update():
+
+V = local_version()
+
+
+def update_cache():
+    return shark_dirs.cache_dir("update.json")
+
+
+def cached_update():
     try:
-        url = "https://raw.githubusercontent.com/oppoornose-jpg/SharkBuster/main/version.txt"
-        remote_version = requests.get(url, timeout=3).text.strip()
-
-        if remote_version != V:
-            print(f"[*] Update found! Local: {V} | Remote: {remote_version}")
-
-            if os.path.isdir(".git"):
-                print("[*] Updating tool to latest version...")
-                os.system("git pull")
-                
-                if os.path.isfile("version.txt"):
-                    with open("version.txt", "r") as f:
-                        V_local = f.read().strip()
-                    print(f"[*] Updated to version {V_local}")
-                else:
-                    print("[!] version.txt not found after update")
-                
-                print( "[*] updated  Please restart the tool manually.")
-                sys.exit(0)
-
-            else:
-                print("[!] Cannot auto-update, folder is not a git repository")
-                print("[*] If updated manually, please restart the tool.")
-                sys.exit(0)
+        with open(update_cache()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-        else:
-            print(f"[*] Tool is up-to-date (version {V})")
 
-    except Exception as e:
-        print(f"[!] Update check failed: {e}")
-        sys.exit(0)
+def refresh_update():
+    # stdlib only, runs in a daemon thread and never raises
+    from urllib.request import urlopen
+    try:
+        with urlopen(UPDATE_URL, timeout=3) as r:
+            remote = r.read().decode().strip()
+    except Exception:
+        return
+    os.makedirs(shark_dirs.cache_dir(), exist_ok=True)
+    tmp = update_cache() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"checked": time.time(), "remote": remote}, f)
+    os.replace(tmp, update_cache())
 
-check_update()
 
-GREEN   = "\033[92m"
-CYAN    = "\033[96m"
-YELLOW  = "\033[93m"
-RED     = "\033[91m"
-RESET   = "\033[0m"
+def start_update_check():
+    # whatever the last check found is used now; a new check only runs
+    # once the cached answer is older than UPDATE_TTL, in the background
+    if time.time() - cached_update().get("checked", 0) > UPDATE_TTL:
+        threading.Thread(target=refresh_update, daemon=True).start()
+
+
+def check_update():
+    remote_version = cached_update().get("remote")
+    if not remote_version:
+        return
+    if remote_version != V:
+        print(f"[*] Update found! Local: {V} | Remote: {remote_version}")
+
+        if os.path.isdir(".git"):
+            print("[*] Updating tool to latest version...")
+            os.system("git pull")
+
+            print(f"[*] Updated to version {local_version()}")
+            print( "[*] updated  Please restart the tool manually.")
+            sys.exit(0)
+
+        else:
+            print("[!] Cannot auto-update, folder is not a git repository")
+            print("[*] If updated manually, please restart the tool.")
+
+    else:
+        print(f"[*] Tool is up-to-date (version {V})")
+
 
 def clear():
     os.system("clear" if os.name != "nt" else "cls")
 
-def run(tool):
+
+def run(module, entry="main", pause=True):
+    # tools are imported and run in this process: their imports happen
+    # once, and the event loop, HTTP session, mapped wordlists, target
+    # calibrations and TLS results stay warm for the next pick
     try:
-        os.system(f"python3 {tool}")
+        fn = getattr(importlib.import_module(module), entry)
+        if asyncio.iscoroutinefunction(fn):
+            import shark_runtime
+            shark_runtime.run(fn())
+        else:
+            fn()
     except KeyboardInterrupt:
         print(RED + "\n[!] Stopped by user" + RESET)
-        input("Press Enter to return...")
-
-while True:
-    clear()
-   
-    print(f"{GREEN}")
-    print("███████╗██╗  ██╗ █████╗ ██████╗ ██╗  ██╗")
-    print("██╔════╝██║  ██║██╔══██╗██╔══██╗██║ ██╔╝")
-    print("███████╗███████║███████║██████╔╝█████╔╝ ")
-    print("╚════██║██╔══██║██╔══██║██╔══██╗██╔═██╗ ")
-    print("███████║██║  ██║██║  ██║██║  ██║██║  ██╗")
-    print("╚══════╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝")
-    print(RESET)
-
-    
-    print(YELLOW + "=== Shark Tools Launcher ===" + RESET)
-    print(f"{CYAN}1){RESET} SharkBuster-web - Web Discovery Fast Tool for finding secret web paths like gobuster")
-    print(f"{CYAN}2){RESET} SharkBuster-Scan - tool for scanning websites.")
-    print(f"{CYAN}3){RESET} SharkBuster-AI - an chat AI from SharkBuster ")
-    print(f"{CYAN}0){RESET} Exit")
-    
-    print(GREEN + "This tool automatically checks for updates and keeps itself up-to-date.")
-    print(GREEN + "Enjoy using it without any worries!", RESET)
-    choice = input("\nChoose an option: ").strip()
-
-    if choice == "1":
-        os.system("python3 Shark4.py")
-    elif choice == "2":
-        os.system("python3 Shark3.py")
-    elif choice == "0":
-        print(GREEN + "exited" + RESET)
-        sys.exit()
-    elif choice == "3":
-        os.system("python3 Shark5.py")
+    except SystemExit:
+        pass
+    if pause:
+        input("\nPress Enter to return to launcher...")
+
+
+def menu():
+    while True:
+        clear()
+
+        print(f"{GREEN}")
+        print("███████╗██╗  ██╗ █████╗ ██████╗ ██╗  ██╗")
+        print("██╔════╝██║  ██║██╔══██╗██╔══██╗██║ ██╔╝")
+        print("███████╗███████║███████║██████╔╝█████╔╝ ")
+        print("╚════██║██╔══██║██╔══██║██╔══██╗██╔═██╗ ")
+        print("███████║██║  ██║██║  ██║██║  ██║██║  ██╗")
+        print("╚══════╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝")
+        print(RESET)
+
+
+        print(YELLOW + "=== Shark Tools Launcher ===" + RESET)
+        print(f"{CYAN}1){RESET} SharkBuster-web - Web Discovery Fast Tool for finding secret web paths like gobuster")
+        print(f"{CYAN}2){RESET} SharkBuster-Scan - tool for scanning websites.")
+        print(f"{CYAN}3){RESET} SharkBuster-AI - an chat AI from SharkBuster ")
+        print(f"{CYAN}0){RESET} Exit")
+
+        print(GREEN + "This tool automatically checks for updates and keeps itself up-to-date.")
+        print(GREEN + "Enjoy using it without any worries!", RESET)
+        choice = input("\nChoose an option: ").strip()
+
+        if choice == "1":
+            run("Shark4")
+        elif choice == "2":
+            run("Shark3")
+        elif choice == "0":
+            print(GREEN + "exited" + RESET)
+            sys.exit()
+        elif choice == "3":
+            run("Shark5", "chat")
+        else:
+            input(RED + "Invalid choice, press Enter..." + RESET)
+
+
+# -- headless: flags and/or a JSON config, no prompts, banners or clear
+
+def load_config(path):
+    # {"update_check": true, "web": {...}, "scan": {...}}, keys are the
+    # long option names with "_" for "-"
+    if not path:
+        path = config_path()
+        if not os.path.isfile(path):
+            return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def net_args(p):
+    p.add_argument("--resolve", action="append", metavar="HOST:IP",
+                   help="connect to IP for HOST (Host and SNI stay HOST), repeatable")
+    p.add_argument("--resolve-once", action="store_true", default=None,
+                   help="resolve each host once and keep the address for the whole run")
+
+
+def apply_net(o):
+    import shark_net
+    resolver = shark_net.DEFAULT.resolver
+    for pin in o.get("resolve") or ():
+        host, _, ip = pin.partition(":")
+        if not host or not ip:
+            sys.exit(f"--resolve: expected HOST:IP, got {pin}")
+        resolver.pin(host, ip.strip("[]"))
+    if o.get("resolve_once"):
+        resolver.ttl = float("inf")
+
+
+def parse_args(argv):
+    ap = argparse.ArgumentParser(
+        prog="Shark.py",
+        description="SharkBuster launcher. Without a command it opens the interactive menu. "
+                    "For educational and authorized testing only.")
+    ap.add_argument("--config", help=f"JSON config file (default {config_path()} if it exists)")
+    ap.add_argument("--no-update-check", dest="update_check", action="store_false", default=None,
+                    help="skip the background update check")
+    sub = ap.add_subparsers(dest="command")
+
+    web = sub.add_parser("web", help="SharkBuster-web: wordlist discovery (Shark4)")
+    web.add_argument("-t", "--target", help="host, url, or file with one target per line")
+    web.add_argument("-w", "--wordlist", help="wordlist file(s), comma separated")
+    web.add_argument("-d", "--depth", type=int, help="recursion depth for found directories")
+    web.add_argument("-p", "--processes", type=int, help="worker processes")
+    web.add_argument("-o", "--output", help="results file (batch mode: directory)")
+    web.add_argument("--stats", help="stats JSON file")
+    web.add_argument("-x", "--ext", help="extensions to try on every word, comma separated")
+    web.add_argument("--backup", help="backup suffixes to try, e.g. bak,old,~")
+    web.add_argument("--case", help="case variants: lower,upper,title")
+    web.add_argument("--prefix", help="prefixes to try, e.g. _,.,old_")
+    web.add_argument("--budget", type=int, help="stop each target after this many wordlist paths")
+    web.add_argument("--budget-time", type=float, help="stop the scan after this many minutes")
+    web.add_argument("--no-rank", dest="rank", action="store_false", default=None,
+                     help="keep wordlist order instead of trying past hits first")
+    web.add_argument("--resume", action="store_true", default=None, help="resume from a checkpoint")
+    web.add_argument("--no-progress", dest="progress", action="store_false", default=None)
+    net_args(web)
+
+    scan = sub.add_parser("scan", help="SharkBuster-Scan: security report (Shark3)")
+    scan.add_argument("-t", "--target", help="host, url, or file with one target per line")
+    scan.add_argument("-m", "--mode", choices=("bug", "full"), help="bug-bounty (safe) or full search")
+    scan.add_argument("-w", "--wordlist", help="wordlist file (default oli.txt)")
+    scan.add_argument("-r", "--report-dir", help="where batch reports go")
+    scan.add_argument("--no-progress", dest="progress", action="store_false", default=None)
+    net_args(scan)
+
+    ai = sub.add_parser("ai", help="SharkBuster-AI chat (Shark5)")
+    ai.add_argument("--offline", action="store_true", default=None,
+                    help="answer Wikipedia questions from the local cache only")
+    ai.add_argument("--wiki-url", help="summary endpoint, {lang} is filled in")
+    return ap, ap.parse_args(argv)
+
+
+def options(args, cfg, defaults):
+    # defaults < config file < command line
+    opts = dict(defaults)
+    opts.update(cfg.get(args.command, {}))
+    opts.update({k: v for k, v in vars(args).items() if v is not None})
+    return opts
+
+
+def run_web(o):
+    import Shark4
+    import shark_engine
+    if not o.get("target") or not o.get("wordlist"):
+        sys.exit("web: --target and --wordlist are required")
+    apply_net(o)
+    if o.get("output"):
+        Shark4.RESULTS_FILE = Shark4.RESULTS_DIR = o["output"]
+    if o.get("stats"):
+        Shark4.STATS_FILE = o["stats"]
+    for key, const in (("ext", "EXTENSIONS"), ("backup", "BACKUPS"), ("case", "CASES"),
+                       ("prefix", "PREFIXES")):
+        if o.get(key):
+            setattr(Shark4, const, tuple(x.strip() for x in o[key].split(",") if x.strip()))
+    if o.get("budget"):
+        Shark4.BUDGET_PATHS = o["budget"]
+    if o.get("budget_time"):
+        Shark4.BUDGET_TIME = o["budget_time"] * 60
+    if o.get("rank") is False:
+        Shark4.RANK = False
+    files = Shark4.wordlist_files(o["wordlist"])
+    missing = [x for x in files if not os.path.isfile(x)]
+    if missing:
+        sys.exit(f"web: wordlist not found: {', '.join(missing)}")
+    hosts = shark_engine.read_targets(o["target"], Shark4.log)
+    if not hosts:
+        sys.exit("web: invalid target")
+    Shark4.run_scan(hosts, files, o.get("depth", 0),
+                    o.get("processes", 1), bool(o.get("resume")), o.get("progress"))
+
+
+def run_scan(o):
+    import Shark3
+    import shark_engine
+    import shark_runtime
+    if not o.get("target"):
+        sys.exit("scan: --target is required")
+    apply_net(o)
+    Shark3.WORDLIST_FILE = o.get("wordlist") or os.path.join(HERE, Shark3.WORDLIST_FILE)
+    if o.get("report_dir"):
+        Shark3.REPORTS_DIR = o["report_dir"]
+    bases = shark_engine.read_targets(o["target"], Shark3.log)
+    if not bases:
+        sys.exit("scan: invalid target")
+    shark_runtime.run(Shark3.run_scan(bases, o.get("mode", "bug").upper(), o.get("progress")))
+
+
+def run_ai(o):
+    cd_to_sharkbuster()
+    import Shark5
+    if o.get("offline"):
+        Shark5.OFFLINE = True
+    if o.get("wiki_url"):
+        Shark5.WIKI_URL = o["wiki_url"]
+    run("Shark5", "chat", pause=False)
+
+
+def main(argv=None):
+    ap, args = parse_args(sys.argv[1:] if argv is None else argv)
+    cfg = load_config(args.config)
+    update = args.update_check if args.update_check is not None else cfg.get("update_check", True)
+    if update:
+        start_update_check()
+    if args.command == "web":
+        run_web(options(args, cfg, {"depth": 0, "processes": 1}))
+    elif args.command == "scan":
+        run_scan(options(args, cfg, {"mode": "bug"}))
+    elif args.command == "ai":
+        run_ai(options(args, cfg, {}))
     else:
-        input(RED + "Invalid choice, press Enter..." + RESET)
+        cd_to_sharkbuster()
+        customize()
+        install_kali_menu()
+        if update:
+            check_update()
+        menu()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(RED + "\n[!] Stopped by user" + RESET)
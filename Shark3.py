@@ -1,8 +1,6 @@
-import os
-os.system("clear")
 import os, sys
 
-REQUIRED = ["aiohttp"]
+REQUIRED = ["aiohttp", "numpy"]
 
 missing = []
 for lib in REQUIRED:
@@ -16,21 +14,35 @@ if missing:
     while True:
         c = input("Install required libraries? (yes/no): ").lower()
         if c == "yes":
-            os.system("sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq python3-aiohttp")
+            os.system("sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq python3-aiohttp python3-numpy")
             print("Done. Restart the tool.")
             sys.exit(0)
         elif c == "no":
             print("Cannot run without required libraries.")
             sys.exit(1)
 
-import asyncio, aiohttp, ssl, socket, time
+import asyncio, time
 from urllib.parse import urlparse
+import shark_engine
+import shark_wordlist
+from shark_cache import SingleFlight
+import shark_tls
+import shark_runtime
+import shark_history
+import shark_rank
 
 RED="\033[91m"; GREEN="\033[92m"; YELLOW="\033[93m"
 CYAN="\033[96m"; PURPLE="\033[95m"; RESET="\033[0m"
 
-TIMEOUT=aiohttp.ClientTimeout(total=5)
+TIMEOUT=5
 WORDLIST_FILE="oli.txt"
+REPORTS_DIR="reports"
+MAX_HOSTS=10
+TLS=None
+HISTORY=True
+RANK=True
+# Bug-Bounty mode tries this many wordlist paths per target, likeliest first
+BUG_BUDGET=694
 
 WAF_SIG={
     "Cloudflare":"cloudflare",
@@ -47,8 +59,7 @@ SEC_HEADERS=[
     "referrer-policy"
 ]
 
-results=[]
-SEM=None
+LIMITS={}
 WORDLIST=[]
 ENABLE_DIRLIST=False
 ENABLE_METHODS=False
@@ -91,135 +102,187 @@ def choose_mode():
     if c=="0": sys.exit()
     return None
 
-def validate_target(t):
-    if not t: return None
-    if not t.startswith(("http://","https://")):
-        t="https://"+t
-    p=urlparse(t)
-    if not p.netloc or "." not in p.netloc:
-        return None
-    return t.rstrip("/")
-
 def load_wordlist():
     if not os.path.isfile(WORDLIST_FILE):
         print(RED+f"Wordlist not found: {WORDLIST_FILE}"+RESET)
         sys.exit(1)
-    with open(WORDLIST_FILE, errors="ignore") as f:
-        return ["/"+l.strip().lstrip("/") for l in f if l.strip()]
+    return shark_wordlist.load(WORDLIST_FILE)
+
+class Target:
+    # report state for one host, the wordlist scan itself is the engine's
+    def __init__(self,scan):
+        self.scan=scan
+        self.base=scan.base.rstrip("/")
+        self.host=urlparse(self.base).hostname
+        self.cache=SingleFlight()
+        self.results=[]
 
-async def fetch(session,url):
-    async with SEM:
-        try:
-            async with session.get(url,allow_redirects=False) as r:
-                return r, await r.read()
-        except:
-            return None,None
+async def fetch_once(t,session,url):
+    # every passive check reads the same response, the url is only
+    # requested by whichever caller asks first
+    return await t.cache.do(url,lambda: t.scan.fetch_retry(session,url,get=True))
 
 def risk(l): return {"Low":3,"Medium":6,"High":9}.get(l,0)
-async def check_path(session, base, path, baseline):
-    r, b = await fetch(session, base + path)
-    if r and r.status in (200, 401, 403) and len(b) != baseline:
-        results.append(("Secret Path", path, "Medium"))
-async def scan_wordlist(session, base, baseline):
-    batch = []
-    batch_size = SEM._value  
-
-    for p in WORDLIST:
-        batch.append(p)
-
-        if len(batch) == batch_size:
-            await asyncio.gather(
-                *(check_path(session, base, path, baseline) for path in batch)
-            )
-            batch.clear()
-
-    if batch:
-        await asyncio.gather(
-            *(check_path(session, base, path, baseline) for path in batch)
-        )
 
-async def scan_headers(session,base):
-    r,_=await fetch(session,base)
-    if not r: return
+ANALYZERS=[]
+
+def analyzer(fn):
+    # passive checks over an already fetched (response, body) pair
+    ANALYZERS.append(fn)
+    return fn
+
+@analyzer
+def check_headers(t,r,body):
     miss=[h for h in SEC_HEADERS if h not in r.headers]
     if miss:
-        results.append(("Missing Security Headers",", ".join(miss),"Medium"))
+        t.results.append(("Missing Security Headers",", ".join(miss),"Medium"))
 
-async def scan_server(session,base):
-    r,_=await fetch(session,base)
-    if not r: return
+@analyzer
+def check_server(t,r,body):
     srv=r.headers.get("Server","")
     if any(x in srv for x in ("Apache/2.2","nginx/1.0","PHP/5")):
-        results.append(("Outdated Server",srv,"High"))
+        t.results.append(("Outdated Server",srv,"High"))
     elif srv:
-        results.append(("Server Info",srv,"Low"))
+        t.results.append(("Server Info",srv,"Low"))
 
-async def scan_waf(session,base):
-    r,_=await fetch(session,base)
-    if not r: return
+@analyzer
+def check_waf(t,r,body):
     h=" ".join(r.headers.values()).lower()
     for n,s in WAF_SIG.items():
         if s in h:
-            results.append(("WAF Detected",n,"Low"))
+            t.results.append(("WAF Detected",n,"Low"))
             return
 
-def scan_tls(host):
-    try:
-        ctx=ssl.create_default_context()
-        with socket.create_connection((host,443),timeout=4) as sock:
-            with ctx.wrap_socket(sock,server_hostname=host) as s:
-                v=s.version()
-                if v in ("TLSv1","TLSv1.1"):
-                    results.append(("Weak TLS Version",v,"High"))
-                else:
-                    results.append(("TLS Version",v,"Low"))
-    except: pass
+async def analyze(t,session,path=""):
+    r=await fetch_once(t,session,path)
+    if not r: return
+    for a in ANALYZERS:
+        a(t,r,r.body)
 
-async def main():
-    banner()
-    mode=None
-    while not mode:
-        mode=choose_mode()
+async def scan_tls(t):
+    # one inspector for the whole run: shared handshake budget and cache
+    u=urlparse(t.base)
+    port=u.port if u.scheme=="https" and u.port else 443
+    info=await TLS.inspect(t.host,port)
+    t.results.extend(shark_tls.findings(info))
+
+def report(t):
+    score=sum(risk(x[2]) for x in t.results)
+    level="Low" if score<10 else "Medium" if score<20 else "High"
+    lines=[f"[{r[0]}] {r[1]}  Risk:{r[2]}" for r in t.results]
+    return score,level,lines
 
-    global SEM, WORDLIST
+def print_report(t):
+    score,level,_=report(t)
+    print(CYAN+f"\n=== Security Report: {t.base} ==="+RESET)
+    for r in t.results:
+        print(f"{YELLOW}[{r[0]}]{RESET} {r[1]}  Risk:{r[2]}")
+    print(GREEN+f"\nOverall Risk: {level} ({score})"+RESET)
+
+def save_report(t):
+    score,level,lines=report(t)
+    os.makedirs(REPORTS_DIR,exist_ok=True)
+    path=os.path.join(REPORTS_DIR,urlparse(t.base).netloc.replace(":","_")+".txt")
+    with open(path,"w") as f:
+        f.write("\n".join(lines+[f"Overall Risk: {level} ({score})",""]))
+    return path
+
+def log(kind,msg):
+    print((RED if kind=="error" else "")+msg+RESET)
+
+async def run_scan(bases,mode="BUG",progress=None):
+    # everything after the prompts, also what the launcher runs headless
+    global LIMITS, WORDLIST, TLS
+    if TLS is None:
+        # kept for the life of the process, a second run from the
+        # launcher reuses its cached handshakes
+        TLS=shark_tls.TLSInspector()
     WORDLIST=load_wordlist()
 
     if mode=="BUG":
-        SEM=asyncio.Semaphore(60)
-        WORDLIST=WORDLIST[:694]
+        LIMITS=dict(start=20,floor=2,ceiling=60)
         print(CYAN+"Mode: Bug‑Bounty (Safe)\n"+RESET)
     else:
-        SEM=asyncio.Semaphore(60)
+        LIMITS=dict(start=30,floor=4,ceiling=150)
         print(CYAN+"Mode: Full Search (Recon‑Only)\n"+RESET)
 
-    t=input("Target: ").strip()
-    base=validate_target(t)
-    if not base:
-        print(RED+"Invalid target"+RESET); sys.exit(1)
-    print(GREEN + f"SCANNING {t} ... please wait..." + RESET)
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        r,b=await fetch(session,base+"/__404_test__")
-        baseline=len(b) if b else 0
+    engine=shark_engine.Engine(bases,WORDLIST,shark_engine.Options(
+        concurrency=LIMITS["ceiling"],
+        min_concurrency=LIMITS["floor"],
+        start_concurrency=LIMITS["start"],
+        calibrate_hosts=MAX_HOSTS,
+        timeout=TIMEOUT,
+        valid=(200,401,403),
+        boring_redirects=(),
+        progress=sys.stdout.isatty() if progress is None else progress,
+        order=shark_rank.HitStats.load().order if RANK else None,
+        budget_paths=BUG_BUDGET if mode=="BUG" else 0,
+    ))
+    targets=[Target(s) for s in engine.scans]
+    by_scan={id(x.scan):x for x in targets}
+    print(GREEN + f"SCANNING {', '.join(bases[:3])}{' ...' if len(bases)>3 else ''} ... please wait..." + RESET)
+
+    history=shark_history.HistoryWriter("recon",engine.hosts,f"{WORDLIST_FILE}:{len(WORDLIST)}:{mode}") if HISTORY else None
+
+    def on_hit(scan,rec):
+        by_scan[id(scan)].results.append(("Secret Path","/"+rec["url"][len(scan.base):],"Medium"))
+        if history: history.add_path(rec)
+
+    # wordlist scan, passive analyzers and TLS all run at once, over the
+    # process's shared session and each host's limiter
+    session=await shark_runtime.session(engine.metrics)
+    finished=[]
+    try:
         await asyncio.gather(
-            scan_wordlist(session,base,baseline),
-            scan_headers(session,base),
-            scan_server(session,base),
-            scan_waf(session,base)
+            engine.run(on_hit,session),
+            *(analyze(x,session) for x in targets),
+            *(scan_tls(x) for x in targets)
         )
+        # a Bug-Bounty scan is done once its budget is: there is no
+        # checkpoint to go on from, the next run starts over
+        finished=[x.scan.base for x in targets if x.scan.finished or x.scan.stopped]
+        for x in targets:
+            for title,detail,level in x.results:
+                if title!="Secret Path" and history: history.add_finding(x.scan.base,title,detail,level)
+    finally:
+        # an interrupted run is kept, but never diffed against
+        if history:
+            for x in targets: history.set_tech(x.scan.base,x.scan.tech)
+            history.finish(finished)
 
-    scan_tls(urlparse(base).hostname)
+    db=shark_history.connect(history.path) if history else None
+    for target in targets:
+        gone=target.scan.unresolved
+        if gone:
+            # coverage gap, not a finding: no risk points
+            more=f" (+{len(gone)-5} more)" if len(gone)>5 else ""
+            target.results.append(("Unresolved Paths",
+                f"{len(gone)} timed out or throttled: "+", ".join("/"+p for p,_ in gone[:5])+more,"Info"))
+        print_report(target)
+        d=db and target.scan.base in finished and shark_history.diff(db,target.scan.base,history.scan)
+        lines=shark_history.diff_text(d) if d else []
+        if lines:
+            print(CYAN+lines[0]+RESET)
+            print("\n".join(lines[1:]))
+        if len(targets)>1:
+            print(GREEN+f"saved {save_report(target)}"+RESET)
+    if db: db.close()
 
-    score=sum(risk(x[2]) for x in results)
-    level="Low" if score<10 else "Medium" if score<20 else "High"
-
-    print(CYAN+"\n=== Security Report ==="+RESET)
-    for r in results:
-        print(f"{YELLOW}[{r[0]}]{RESET} {r[1]}  Risk:{r[2]}")
-    print(GREEN+f"\nOverall Risk: {level} ({score})"+RESET)
+async def main():
+    os.system("clear")
+    banner()
+    mode=None
+    while not mode:
+        mode=choose_mode()
+    t=input("Target (or file with one target per line): ").strip()
+    bases=shark_engine.read_targets(t,log)
+    if not bases:
+        print(RED+"Invalid target"+RESET); sys.exit(1)
+    await run_scan(bases,mode)
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        shark_runtime.run(main())
     except KeyboardInterrupt:
         print("\n[!] Interrupted")
     finally:
@@ -1,6 +1,9 @@
-print("SharkBuster")
+import importlib.util, os
 try:
-    import requests, os, colorama, threading, time, asyncio, aiohttp, shutil
+    # find_spec only: the launcher's headless path never needs requests
+    for lib in ("requests", "colorama", "aiohttp", "numpy"):
+        if importlib.util.find_spec(lib) is None:
+            raise ImportError(lib)
 except ImportError:
             
             print("Error: missing libraries")
@@ -9,7 +12,7 @@ except ImportError:
                 if req == "yes":
                     print("installing...")
                     print("installing speed depends on your internet speed")
-                    os.system("sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq python3-requests python3-colorama python3-aiohttp")
+                    os.system("sudo DEBIAN_FRONTEND=noninteractive apt-get install -y -qq python3-requests python3-colorama python3-aiohttp python3-numpy")
                     print("if you have an error  if its still report it in issues")
                     break
                 elif req == "no":
@@ -20,15 +23,17 @@ except ImportError:
                     print( "You must type yes or no ")
                     print(req) 
 import os
-from colorama import Fore, Style, init
-import requests
-import threading
+from colorama import Fore, init
 import sys
 import time
-import asyncio
-import aiohttp
 import atexit, signal
-import random
+import shark_wordlist
+import shark_engine
+import shark_runtime
+import shark_expand
+import shark_history
+import shark_rank
+from shark_sink import render
 ANDROID_UA = [
     f"Mozilla/5.0 (Linux; Android {v}; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36"
     for v in range(7, 16)
@@ -47,216 +52,286 @@ DESKTOP_UA = [
 
 USER_AGENTS = ANDROID_UA + IOS_UA + DESKTOP_UA
 init(autoreset=True)
-results = []
-def save_progress():
-    if results:
-        with open("results.txt", "w") as f:
-            f.write("\n".join(results))
-        print("\nsaved progress results in results.txt")
-        time.sleep(3.2)
-atexit.register(save_progress)
-signal.signal(signal.SIGTSTP, lambda s, f: exit())
-signal.signal(signal.SIGTERM, lambda s, f: exit())        
-
-        
-
-def boot():
-    print("started")
-    os.system("clear")
-    print("started")
-    
-boot() 
+RESULTS_FILE = "results.jsonl"
+RESULTS_DIR = "results"
+COLOR = sys.stdout.isatty()
+CONCURRENCY = 200
+MIN_CONCURRENCY = 8
+START_CONCURRENCY = 50
+MAX_WORKERS = 1000
+CALIBRATE_HOSTS = 20
+PROBE_MODE = "auto"
+CHECKPOINT_INTERVAL = 10
+TIMEOUT = 3.7
+STATS_FILE = "stats.json"
+STATS_INTERVAL = 5.0
+TRACE_STAGES = False
+RETRIES = 3
+UNRESOLVED_FILE = "unresolved.txt"
+HISTORY = True
+# try the paths past scans found first, and optionally stop each target
+# after BUDGET_PATHS wordlist paths or the whole scan after BUDGET_TIME seconds
+RANK = True
+BUDGET_PATHS = 0
+BUDGET_TIME = 0
+# expansion rules applied to every wordlist entry, e.g. EXTENSIONS = ("php", "html")
+EXTENSIONS = ()
+BACKUPS = ()
+CASES = ()
+PREFIXES = ()
+LOG_COLORS = {"warn": Fore.YELLOW, "error": Fore.RED, "dir": Fore.CYAN}
 
+ingored1= ("login", "signin", "auth")
+valid = {200,301,302,307,401,403,429}
 
-                          
+ingored = (".jpg", ".png", ".css", ".js", ".svg", ".ico")
 
-    
-text = "AUTHOUR: Owis          "  
+engine = None
+history = None
 
 
+def log(kind, msg):
+    if engine is not None:
+        engine.clear_progress()
+    print(LOG_COLORS.get(kind, "") + msg)
 
 
+def show_hit(scan, rec):
+    engine.clear_progress()
+    print(render(rec, COLOR))
+    if history is not None:
+        history.add_path(rec)
 
-while True:
-    name = input(
-        "just for using this tool you agree that is for educational purposes only "
-        "if you agree press enter, else Ctrl+Z"
-    )
-    if name == "":
-        break
-    else:
-        print("\033[91mPlease press Enter only!\033[0m")
 
-RED = "\033[91m"
-RESET = "\033[0m"
-print(Fore.YELLOW + "warning")
-print(RED + " you agreed using tool for educational purposes only " + RESET, name)
-time.sleep(2.5)
+def save_progress(quiet=False):
+    if engine is None:
+        return
+    saved = engine.close()
+    if quiet:
+        return
+    for scan in engine.active:
+        if scan.sink and scan.sink.count:
+            print(f"\nsaved {scan.sink.count} results in {scan.results_file}")
+    if saved:
+        print("\ncheckpoint saved, run the same target and wordlist again to resume")
 
 
-target_line = 7
-colors = list(range(0, 256))
+atexit.register(save_progress)
 
-end_time = time.time() + 3.3
-while time.time() < end_time:
-    out = ""
-    for i, c in enumerate(text):
-        color = colors[i % len(colors)]
-        out += f"\033[38;5;{color}m{c}"
-    sys.stdout.write("\r" + out + "\033[0m")
-    sys.stdout.flush()
-    colors = colors[1:] + colors[:1]  
-    time.sleep(0.05)
 
+def save_unresolved(items):
+    # paths that timed out or stayed throttled through every retry, so
+    # they can be checked again instead of counted as misses. Without any
+    # the list of an earlier scan goes, it would name paths that resolved
+    if not items:
+        if os.path.exists(UNRESOLVED_FILE):
+            os.remove(UNRESOLVED_FILE)
+        return
+    with open(UNRESOLVED_FILE, "w") as f:
+        f.write("".join(f"{url} {why}\n" for url, why in items))
+    print(Fore.YELLOW + f"{len(items)} paths unresolved after retries, listed in {UNRESOLVED_FILE}")
 
-host = input("target host or url: ")
 
-if not host.startswith(("http://", "https://")):
-    host = "https://" + host
+def boot():
+    print("started")
+    os.system("clear")
+    print("started")
 
-while not host:
-    print(Fore.RED + "you should enter target host or url")
-    host = input("target full url: ")
-    time.sleep(3)
-    
 
-ingored1= ("login", "signin", "auth")
-valid = {200,301,302,307,401,403,429}
+def wordlist_files(w):
+    return [x.strip() for x in w.split(",") if x.strip()]
 
-ingored = (".jpg", ".png", ".css", ".js", ".svg", ".ico")
 
-baseline = None   
-
-r = requests.get(host)
-print("status ",r.status_code)
-
-wordlist = input("wordlist file: ")
-while not wordlist or not os.path.isfile(wordlist):
-    k = "please check that you moved paths wordlist to SharkBuster file or wordlist exist"
-    print(Fore.RED + "Invalid wordlist file")
-    print(Fore.YELLOW + k)
-    wordlist = input("wordlist file: ")
-print(Fore.GREEN + "for stop ctrl + c note: dont press ctrl +z it will cause error.")
-word = (Fore.GREEN + " wordlist: ")
-base = host.rstrip("/") + "/"
-print("trying with url "+ host + word ,wordlist)
-
-
-sem = asyncio.Semaphore(200)
-lock = asyncio.Lock()
-start_time = time.time()
-
-def status_color(code):
-    if code == 200:
-        return Fore.GREEN
-    elif code in (301, 302, 307):
-        return Fore.YELLOW
-    elif code in (429,500):
-        return Fore.RED
-    elif code in (401, 403):
-        return Fore.CYAN
+def run_scan(hosts, files, max_depth=0, processes=1, resume=None, progress=None):
+    # the scan without any of the prompts; resume=None asks when there
+    # is a checkpoint, True/False decides without asking
+    global engine
+    signal.signal(signal.SIGTERM, lambda s, f: exit())
+    words = shark_wordlist.load(files, ingored)
+    if EXTENSIONS or BACKUPS or CASES or PREFIXES:
+        base = len(words)
+        words = shark_expand.Expansion(words, EXTENSIONS, BACKUPS, CASES, PREFIXES)
+        print(f"{base} unique paths, {len(words)} with extensions and suffixes")
     else:
-        return Fore.WHITE
-
+        print(f"{len(words)} unique paths")
+
+    engine = shark_engine.Engine(hosts, words, shark_engine.Options(
+        concurrency=CONCURRENCY,
+        min_concurrency=MIN_CONCURRENCY,
+        start_concurrency=START_CONCURRENCY,
+        max_workers=MAX_WORKERS,
+        calibrate_hosts=CALIBRATE_HOSTS,
+        probe_mode=PROBE_MODE,
+        timeout=TIMEOUT,
+        valid=valid,
+        max_depth=max_depth,
+        processes=processes,
+        checkpoint=True,
+        checkpoint_interval=CHECKPOINT_INTERVAL,
+        results_file=RESULTS_FILE,
+        results_dir=RESULTS_DIR,
+        user_agents=USER_AGENTS,
+        sources=files,
+        progress=COLOR if progress is None else progress,
+        stats_file=STATS_FILE,
+        stats_interval=STATS_INTERVAL,
+        trace=TRACE_STAGES,
+        retries=RETRIES,
+        order=shark_rank.HitStats.load().order if RANK else None,
+        budget_paths=BUDGET_PATHS,
+        budget_time=BUDGET_TIME,
+    ), log=log)
+    ranked = sum(1 for s in engine.scans if s.order and s.shard[0] == 0)
+    if ranked:
+        print(f"{ranked} target{'s' if ranked > 1 else ''}: paths found in past scans go first")
+
+    resumable = engine.resumable()
+    if resumable and resume is None:
+        if len(engine.scans) == 1:
+            q = f"resume previous scan ({resumable[0].resume['completed']}/{len(words)} done)? (yes/no): "
+        else:
+            q = f"resume {len({s.base for s in resumable})} targets from their checkpoints? (yes/no): "
+        resume = input(q).lower() == "yes"
+    if not resume:
+        for s in resumable:
+            s.resume = None
+
+    global history
+    if HISTORY:
+        # only a scan of the same scope is compared against: same words,
+        # expansion rules, depth and hit statuses
+        scope = f"{','.join(files)}:{len(words)}:depth {max_depth}:{','.join(map(str, sorted(valid)))}"
+        rules = [",".join(r) for r in (EXTENSIONS, BACKUPS, CASES, PREFIXES)]
+        if any(rules):
+            scope += ":" + "/".join(rules)
+        history = shark_history.HistoryWriter("web", engine.hosts, scope)
+        history.carry(sorted({s.base for s in engine.scans if s.resume}))
+    finished = []
+    try:
+        finished = scan_all()
+    finally:
+        # in the launcher the process lives on after the scan, so results
+        # and checkpoints are saved here rather than at exit
+        save_progress()
+        if history is not None:
+            for s in engine.scans:
+                history.set_tech(s.base, s.tech)
+        engine = None
+        if history is not None:
+            history.finish(finished)
+            show_changes(history, finished)
+            history = None
+
+
+def show_changes(h, bases):
+    # what is different from the last complete scan of each target
+    db = shark_history.connect(h.path)
+    for base in bases:
+        d = shark_history.diff(db, base, h.scan)
+        lines = shark_history.diff_text(d) if d else []
+        if lines:
+            print(Fore.CYAN + lines[0])
+            for line in lines[1:]:
+                print(line)
+    db.close()
+
+
+def scan_all():
+    if engine.opts.processes > 1:
+        st = engine.run_parallel(show_hit)
+        elapsed = st["elapsed"]
+        print(Fore.GREEN + f"\n{st['requests']} requests in {elapsed:.1f}s "
+              f"({st['requests'] / max(elapsed, 0.001):.0f} req/s) "
+              f"across {st['processes']} processes, "
+              f"{st['errors']} errors, "
+              f"{st['timeouts']} timeouts, "
+              f"cpu {st['cpu']:.1f}s")
+        save_unresolved(st["unresolved"])
+        return st["finished"]
+    async def scan():
+        await engine.run(show_hit, await shark_runtime.session(engine.metrics))
+    shark_runtime.run(scan())
+    save_unresolved(engine.unresolved())
+    return engine.summary()["finished"]
 
-async def check(session, p):
-    global baseline
 
-    p = p.strip()
+def main():
+    import requests
+    print("SharkBuster")
+    signal.signal(signal.SIGTSTP, lambda s, f: exit())
+    boot()
+
+    text = "AUTHOUR: Owis          "
+
+    while True:
+        name = input(
+            "just for using this tool you agree that is for educational purposes only "
+            "if you agree press enter, else Ctrl+Z"
+        )
+        if name == "":
+            break
+        else:
+            print("\033[91mPlease press Enter only!\033[0m")
+
+    RED = "\033[91m"
+    RESET = "\033[0m"
+    print(Fore.YELLOW + "warning")
+    print(RED + " you agreed using tool for educational purposes only " + RESET, name)
+    time.sleep(2.5)
+
+    colors = list(range(0, 256))
+
+    end_time = time.time() + 3.3
+    while time.time() < end_time:
+        out = ""
+        for i, c in enumerate(text):
+            color = colors[i % len(colors)]
+            out += f"\033[38;5;{color}m{c}"
+        sys.stdout.write("\r" + out + "\033[0m")
+        sys.stdout.flush()
+        colors = colors[1:] + colors[:1]
+        time.sleep(0.05)
+
+    host = input("target host, url, or file with one target per line: ")
+
+    while not host.strip():
+        print(Fore.RED + "you should enter target host or url")
+        host = input("target full url: ")
+        time.sleep(3)
 
-    if p.endswith(ingored):
-        return
+    hosts = shark_engine.read_targets(host, log)
+    while not hosts:
+        host = input("target host, url, or file with one target per line: ")
+        hosts = shark_engine.read_targets(host, log)
+    if len(hosts) == 1 and not os.path.isfile(host):
+        r = requests.get(hosts[0])
+        print("status ",r.status_code)
+
+    wordlist = input("wordlist file (several: a.txt,b.txt): ")
+    while not wordlist_files(wordlist) or not all(map(os.path.isfile, wordlist_files(wordlist))):
+        k = "please check that you moved paths wordlist to SharkBuster file or wordlist exist"
+        print(Fore.RED + "Invalid wordlist file")
+        print(Fore.YELLOW + k)
+        wordlist = input("wordlist file: ")
+    print(Fore.GREEN + "for stop ctrl + c note: dont press ctrl +z it will cause error.")
+    word = (Fore.GREEN + " wordlist: ")
+    print("trying with url "+ ", ".join(hosts[:3]) + (" ..." if len(hosts) > 3 else "") + word ,wordlist)
+
+    processes = 1
+    cpus = os.cpu_count() or 1
+    if cpus > 1:
+        c = input(f"processes to use, 1-{cpus} (Enter = 1): ").strip()
+        if c.isdigit() and int(c) > 1:
+            processes = min(int(c), cpus)
+
+    max_depth = 0
+    c = input("recursion depth for found directories (Enter = off): ").strip()
+    if c.isdigit():
+        max_depth = int(c)
+
+    run_scan(hosts, wordlist_files(wordlist), max_depth, processes)
 
-    async with sem:
-        try:
-            
- 
-                
-            headers = {
-               "User-Agent": random.choice(USER_AGENTS)
-            }
-            async with session.get(
-                base + p.strip(),
-                timeout=aiohttp.ClientTimeout(total=3.7),
-                allow_redirects=False,
-                headers=headers
-            ) as r:
-
-                
-                location = ""
-                
-
-                if r.status in (301, 302, 307):
-                    location = r.headers.get("Location", "").lower()
-
-                if location in ("/", "/login", "/index.php"):
-                    return
-
-               
-                body = await r.read()
-                length = len(body)
-             
-
-                if baseline and length == baseline:
-                        return
-
-                if r.status in valid and r.status != 204:
-                    return f"{status_color(r.status)}{base+p} {r.status}{Fore.RESET}"
-                return None  
-
-        except Exception:
-            pass
-
-
-async def run():
-    global baseline
-
-    connector = aiohttp.TCPConnector(limit=0)
-    async with aiohttp.ClientSession(
-        connector=connector,
-        headers={"User-Agent": random.choice(USER_AGENTS)}
-    ) as session:
-
-        try:
-            async with session.get(
-                base + "random_not_exist_123456789",
-                timeout=aiohttp.ClientTimeout(total=3.7),
-                allow_redirects=False,
-                headers={"User-Agent": random.choice(USER_AGENTS)}
-            ) as r:
-                baseline = len(await r.read())
-               
-        except:
-            baseline = None
-       
-
-        with open(wordlist, errors="ignore") as f:
-            tasks = []
-            batch_size = 200
-
-            for line in f:
-                tasks.append(asyncio.create_task(check(session, line)))
-
-                if len(tasks) >= batch_size:
-                    results_batch = await asyncio.gather(*tasks)
-                    for res in results_batch:
-                        if res:
-                            print(res)
-                            results.append(res)
-                    tasks.clear()
-
-    
-        if tasks:
-            results_batch = await asyncio.gather(*tasks)
-            for res in results_batch:
-                if res:
-                    print(res)
-                    results.append(res)
-
-                
 
-def main():
-    asyncio.run(run())
 if __name__ == "__main__":
     try:
         main()
@@ -1,9 +1,9 @@
-import json
 import os
 import sys
 import asyncio
+import hashlib
+from bisect import bisect_left
 REQUIRED = ["numpy"]
-os.system("clear")
 
 missing = []
 for lib in REQUIRED:
@@ -26,6 +26,11 @@ if missing:
 
 
 import numpy as np 
+import shark_dirs
+import shark_index
+import shark_model
+import shark_runtime
+import shark_wiki
 responses = {
     "hi": "hi how are you",
     "how are you": "i am fine, thanks!",
@@ -35,105 +40,225 @@ responses = {
     
 }
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+KNOWLEDGE_FILE = "knowledge.json"
+MIN_SCORE = 0.5
+WIKI_URL = shark_wiki.BASE_URL
+OFFLINE = False
+MODEL_DIR = shark_dirs.data_dir("shark5.model")
+DIM = 16
+LAYERS = 2
+HEADS = 1
+
 STOP_WORDS = ["what", "be",  "is", "the", "a", "an", "who", "tell", "me", "about", "how", "make", "does", "why", "can", "things"]
 
 class Tokenizer:
-    def __init__(self, texts):
-        words = sorted(list(set(" ".join(texts).lower().split())))
-        self.stoi = {w:i for i,w in enumerate(words)}
-        self.itos = {i:w for i,w in enumerate(words)}
+    # words is the sorted vocabulary, a list or a model's mapped wordlist;
+    # a word's id is its position, found by bisection so nothing is built
+    # at load time
+    def __init__(self, texts=(), words=None):
+        if words is None:
+            words = sorted(set(" ".join(texts).lower().split()))
+        self.words = words
+
+    def __len__(self):
+        return len(self.words)
+
+    def id(self, w):
+        i = bisect_left(self.words, w)
+        return i if i < len(self.words) and self.words[i] == w else None
 
     def encode(self, text):
-        return [self.stoi[w] for w in text.lower().split() if w in self.stoi]
+        ids = (self.id(w) for w in text.lower().split())
+        return [i for i in ids if i is not None]
 
     def decode(self, tokens):
-        return " ".join([self.itos[t] for t in tokens])
+        return " ".join([self.words[t] for t in tokens])
+
+    def encode_batch(self, texts):
+        # padded (B, T) token ids and the (B, T) mask of real tokens
+        seqs = [self.encode(t) for t in texts]
+        T = max(map(len, seqs), default=0)
+        ids = np.zeros((len(seqs), T), dtype=np.intp)
+        mask = np.zeros((len(seqs), T), dtype=bool)
+        for i, s in enumerate(seqs):
+            ids[i, :len(s)] = s
+            mask[i, :len(s)] = True
+        return ids, mask
 
 
 class Embedding:
-    def __init__(self, vocab_size, dim):
+    def __init__(self, vocab_size, dim, weight=None):
         self.vocab_size = vocab_size
         self.dim = dim
-        self.weight = np.random.randn(vocab_size, dim) * 0.01
+        self.weight = np.random.randn(vocab_size, dim) * 0.01 if weight is None else weight
 
     def forward(self, tokens):
-        return np.array([self.weight[t] for t in tokens])
+        # one gather, for a (T,) sequence or a padded (B, T) batch
+        return self.weight[np.asarray(tokens, dtype=np.intp)]
 
 
 def softmax(x):
     e = np.exp(x - np.max(x, axis=-1, keepdims=True))
     return e / e.sum(axis=-1, keepdims=True)
 
-def attention(Q, K, V):
-    scores = np.dot(Q, K.T) / np.sqrt(Q.shape[1])
+def attention(Q, K, V, mask=None):
+    # (..., T, d) with any leading batch / head axes; mask is True for
+    # the keys that are real tokens, padding gets no weight
+    scores = Q @ np.swapaxes(K, -1, -2) / np.sqrt(Q.shape[-1])
+    if mask is not None:
+        scores = np.where(mask[..., None, :], scores, -1e9)
     weights = softmax(scores)
-    out = np.dot(weights, V)
-    return out
+    return weights @ V
 
 
 class TransformerBlock:
-    def __init__(self, dim):
+    def __init__(self, dim, heads=1, Wqkv=None):
+        assert dim % heads == 0
         self.dim = dim
-        self.Wq = np.random.randn(dim, dim)
-        self.Wk = np.random.randn(dim, dim)
-        self.Wv = np.random.randn(dim, dim)
+        self.heads = heads
+        # Wq, Wk and Wv side by side, one matmul projects all three
+        self.Wqkv = np.random.randn(dim, 3 * dim) if Wqkv is None else Wqkv
 
-    def forward(self, x):
-        Q = x @ self.Wq
-        K = x @ self.Wk
-        V = x @ self.Wv
-        return attention(Q, K, V) + x  
+    def forward(self, x, mask=None):
+        # x is (T, dim) or a (B, T, dim) batch with its (B, T) mask
+        *lead, T, D = x.shape
+        h = self.heads
+        qkv = (x @ self.Wqkv).reshape(*lead, T, 3, h, D // h)
+        # -> 3 x (..., heads, T, head_dim)
+        q, k, v = np.moveaxis(qkv, (-3, -2), (0, -3))
+        if mask is not None:
+            mask = mask[..., None, :]
+        out = attention(q, k, v, mask)
+        return np.moveaxis(out, -3, -2).reshape(*lead, T, D) + x
+
+
+_wiki = None
 
 
 def smart_search(q, lang="en"):
-    try:
-        q_clean = q.lower().replace("?", "")
-        words = q_clean.split()
-        keywords = [w for w in words if w not in STOP_WORDS]
-        if not keywords:
-            return "no result"
-        query = "_".join(keywords)
-
-        summary_cmd = f"curl -s 'https://{lang}.wikipedia.org/api/rest_v1/page/summary/{query}'"
-        summary_result = os.popen(summary_cmd).read()
-        summary = json.loads(summary_result)
-        return summary.get("extract", "no result")
-    except:
-        return "search failed"
-
-
-sample_texts = list(responses.keys())
-tokenizer = Tokenizer(sample_texts)
-embedding = Embedding(len(tokenizer.stoi), dim=16)
-layers = [TransformerBlock(dim=16) for _ in range(2)]  
+    # cached, coalesced and with a timeout; OFFLINE answers from the
+    # cache only
+    global _wiki
+    if _wiki is None or _wiki.lang != lang:
+        _wiki = shark_wiki.WikiClient(WIKI_URL, lang, STOP_WORDS, offline=OFFLINE)
+    return shark_runtime.run(_wiki.summary(q))
+
+
+_model = None
+_knowledge = None
+
+
+def model_config(words):
+    # what a saved model must match to be reused: the sizes above and a
+    # digest of the vocabulary the responses give
+    vocab = hashlib.blake2b("\0".join(words).encode("utf-8"), digest_size=8).hexdigest()
+    return {"dim": DIM, "heads": HEADS, "layers": LAYERS, "vocab": vocab}
+
+
+def build_model():
+    # a fresh model over the responses' words, random weights
+    tokenizer = Tokenizer(list(responses.keys()))
+    embedding = Embedding(len(tokenizer), DIM)
+    layers = [TransformerBlock(DIM, HEADS) for _ in range(LAYERS)]
+    return tokenizer, embedding, layers
+
+
+def save_model(path, tokenizer, embedding, layers):
+    arrays = {"embedding": embedding.weight}
+    for i, layer in enumerate(layers):
+        arrays[f"layer{i}.Wqkv"] = layer.Wqkv
+    shark_model.save(path, model_config(tokenizer.words), tokenizer.words, arrays)
+
+
+def load_model(path):
+    # ValueError when the saved model was built with other sizes or
+    # other responses than this file has now
+    config, words, arrays = shark_model.load(path)
+    if config != model_config(Tokenizer(list(responses.keys())).words):
+        raise ValueError(f"{path}: built for another configuration")
+    tokenizer = Tokenizer(words=words)
+    embedding = Embedding(len(words), config["dim"], arrays["embedding"])
+    layers = [TransformerBlock(config["dim"], config["heads"], arrays[f"layer{i}.Wqkv"])
+              for i in range(config["layers"])]
+    return tokenizer, embedding, layers
+
+
+def model():
+    # MODEL_DIR mapped on first use; without one, or with one that no
+    # longer fits DIM/LAYERS/HEADS or the responses, a model is built and
+    # saved there, so the next start gets the same weights
+    global _model
+    if _model is None:
+        try:
+            _model = load_model(MODEL_DIR) if shark_model.exists(MODEL_DIR) else None
+        except ValueError:
+            _model = None
+        if _model is None:
+            _model = build_model()
+            try:
+                save_model(MODEL_DIR, *_model)
+            except OSError:
+                pass
+    return _model
+
+
+def run_model(texts):
+    # every question in one batch through the layers, (B, T, dim) out
+    tokenizer, embedding, layers = model()
+    ids, mask = tokenizer.encode_batch(texts)
+    x = embedding.forward(ids)
+    for layer in layers:
+        x = layer.forward(x, mask)
+    return x, mask
+
+
+def knowledge():
+    # the built-in responses plus KNOWLEDGE_FILE when there is one,
+    # indexed on first use
+    global _knowledge
+    if _knowledge is None:
+        path = os.path.join(HERE, KNOWLEDGE_FILE)
+        _knowledge = shark_index.KnowledgeBase.load(
+            path if os.path.isfile(path) else None, responses, STOP_WORDS)
+    return _knowledge
+
 
 async def main():
     print("stopped aborting.. ")
     await asyncio.sleep(3)
     print("Done")
 
-while True:
-    q = input("Ask: ").strip()
-    if q.lower() == "exit":
-        break
-
-    key = q.lower()
-    if key in responses:
-        print(responses[key])
-    else:
-        tokens = tokenizer.encode(q.lower())
-        if tokens:
-            x = embedding.forward(tokens)
-            for layer in layers:
-                x = layer.forward(x)
-         
-            print(tokenizer.decode(tokens))
+def chat():
+    # the question loop; a function so the launcher can import this
+    # module and run it in-process
+    os.system("clear")
+    while True:
+        q = input("Ask: ").strip()
+        if q.lower() == "exit":
+            break
+
+        key = q.lower()
+        local = knowledge().answer(q, MIN_SCORE) if key not in responses else None
+        if key in responses:
+            print(responses[key])
+        elif local:
+            print(local)
         else:
+            tokenizer = model()[0]
+            tokens = tokenizer.encode(q.lower())
+            if tokens:
+                run_model([q])
+         
+                print(tokenizer.decode(tokens))
+            else:
         
-            print(smart_search(q, lang="en"))
+                print(smart_search(q, lang="en"))
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        chat()
+        shark_runtime.run(main())
     except KeyboardInterrupt:
         print("\n[!] Interrupted")
     finally:
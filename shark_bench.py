@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import string
+import subprocess
+import tempfile
+import time
+
+from aiohttp import web
+
+import shark_engine
+import shark_wordlist
+from shark_limiter import percentile
+
+HOST = "127.0.0.1"
+PORT = 8931
+
+# stand-in target behaviour. latency is a lognormal (median seconds,
+# sigma) per request; slow is (fraction of paths, extra seconds)
+SCENARIOS = {
+    "plain": dict(words=3000, hits=30, latency=(0.004, 0.5)),
+    "soft404": dict(words=3000, hits=30, latency=(0.004, 0.5), soft404=True),
+    "throttle": dict(words=3000, hits=30, latency=(0.01, 0.3), burst=40),
+    "slow": dict(words=2000, hits=20, latency=(0.004, 0.5), slow=(0.02, 0.8),
+                 big=10, big_size=2 * 1024 * 1024, big_delay=0.01),
+    "redirects": dict(words=3000, hits=20, latency=(0.004, 0.5), chains=20, chain_len=3,
+                      decoys=40),
+    "mixed": dict(words=4000, hits=30, latency=(0.006, 0.7), soft404=True, burst=60,
+                  slow=(0.01, 0.5), big=5, big_size=1024 * 1024, big_delay=0.01,
+                  chains=10, chain_len=3, decoys=20),
+}
+
+# engine settings of the two front-ends
+PROFILES = {
+    "shark4": dict(),
+    "shark3": dict(concurrency=150, min_concurrency=4, start_concurrency=30, timeout=5,
+                   valid=(200, 401, 403), boring_redirects=()),
+}
+
+
+def ground_truth(sc, seed=1):
+    # the wordlist and what the server answers for each entry: hits are
+    # (status, kind), everything else is a miss. Same seed, same scan
+    rnd = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits
+    words = []
+    seen = set()
+    while len(words) < sc["words"]:
+        w = "".join(rnd.choices(alphabet, k=rnd.randint(3, 12)))
+        w += rnd.choice(("", "", "", "/", ".php", ".html", ".bak"))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    picks = rnd.sample(words, sc["hits"] + sc.get("big", 0) + sc.get("chains", 0) + sc.get("decoys", 0))
+    truth = {}
+    for w in picks[:sc["hits"]]:
+        truth[w] = (rnd.choice((200, 200, 200, 401, 403)), "hit")
+    picks = picks[sc["hits"]:]
+    for w in picks[:sc.get("big", 0)]:
+        truth[w] = (200, "big")
+    picks = picks[sc.get("big", 0):]
+    for w in picks[:sc.get("chains", 0)]:
+        truth[w] = (301, "chain")
+    for w in picks[sc.get("chains", 0):]:
+        truth[w] = (302, "decoy")
+    slow_frac, _ = sc.get("slow", (0, 0))
+    slow = set(rnd.sample(words, int(len(words) * slow_frac)))
+    return words, truth, slow
+
+
+def make_app(sc, truth, slow, seed=1):
+    rnd = random.Random(seed)
+    median, sigma = sc["latency"]
+    _, slow_extra = sc.get("slow", (0, 0))
+    burst = sc.get("burst")
+    state = {"inflight": 0}
+
+    async def handle(req):
+        state["inflight"] += 1
+        try:
+            return await answer(req)
+        finally:
+            state["inflight"] -= 1
+
+    async def answer(req):
+        p = req.path.lstrip("/")
+        if burst and state["inflight"] > burst:
+            return web.Response(status=429, text="slow down", headers={"Retry-After": "1"})
+        await asyncio.sleep(rnd.lognormvariate(0, sigma) * median
+                            + (slow_extra if p in slow else 0))
+        if p == "":
+            return web.Response(text="<html>stand-in</html>", headers={"Server": "bench"})
+        if p.startswith("_chain/"):
+            n = int(p.rsplit("/", 1)[-1])
+            if n + 1 < sc.get("chain_len", 1):
+                raise web.HTTPMovedPermanently(f"/_chain/{n + 1}")
+            return web.Response(text="end of chain")
+        hit = truth.get(p)
+        if hit:
+            status, kind = hit
+            if kind == "chain":
+                raise web.HTTPMovedPermanently("/_chain/1")
+            if kind == "decoy":
+                raise web.HTTPFound("/")
+            if kind == "big":
+                return await big_body(req)
+            return web.Response(status=status, text=f"<html>{kind} {p}</html>")
+        if sc.get("soft404"):
+            return web.Response(text=f"<html><body><h1>Not found</h1><p>/{p} is not here</p>"
+                                     f"<p>id {rnd.randint(0, 10 ** 9)}</p></body></html>")
+        return web.Response(status=404, text="not found")
+
+    async def big_body(req):
+        r = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        r.content_length = sc["big_size"]
+        if req.method == "HEAD":
+            await r.prepare(req)
+            return r
+        await r.prepare(req)
+        chunk = b"x" * 65536
+        for _ in range(sc["big_size"] // len(chunk)):
+            await r.write(chunk)
+            await asyncio.sleep(sc["big_delay"])
+        return r
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handle)
+    return app
+
+
+def serve(sc, port, ready):
+    async def main():
+        words, truth, slow = ground_truth(sc)
+        runner = web.AppRunner(make_app(sc, truth, slow), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, HOST, port, backlog=1024).start()
+        ready.set()
+        await asyncio.Event().wait()
+    asyncio.run(main())
+
+
+def run_case(sc, profile, port, words_file, q):
+    # one scan in its own process so CPU time and peak RSS are the scan's
+    words, truth, _ = ground_truth(sc)
+    opts = dict(PROFILES[profile])
+    engine = shark_engine.Engine([f"http://{HOST}:{port}"], shark_wordlist.Wordlist(words_file),
+                                 shark_engine.Options(**opts))
+    latencies = []
+    for scan in engine.scans:
+        record = scan.limiter.record
+
+        def tap(latency, *a, _record=record, **kw):
+            latencies.append(latency)
+            _record(latency, *a, **kw)
+        scan.limiter.record = tap
+    found = set()
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    asyncio.run(engine.run(lambda scan, rec: found.add(rec["url"][len(scan.base):])))
+    elapsed = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    st = engine.summary()
+    expected = {p for p, (status, kind) in truth.items()
+                if status in engine.opts.valid
+                and not (kind == "decoy" and "/" in engine.opts.boring_redirects)}
+    right = len(found & expected)
+    lat = sorted(latencies)
+    q.put({
+        "requests": st["requests"],
+        "errors": st["errors"],
+        "timeouts": st["timeouts"],
+        "elapsed": round(elapsed, 3),
+        "rps": round(st["requests"] / max(elapsed, 1e-9), 1),
+        "p50_ms": round(percentile(lat, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 0.99) * 1000, 2),
+        "cpu_s": round(cpu, 3),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "hits": len(found),
+        "expected": len(expected),
+        "precision": round(right / len(found), 4) if found else 1.0,
+        "recall": round(right / len(expected), 4) if expected else 1.0,
+    })
+
+
+def bench(name, profile, repeat=1, port=PORT):
+    sc = SCENARIOS[name]
+    ctx = multiprocessing.get_context("fork")
+    ready = ctx.Event()
+    server = ctx.Process(target=serve, args=(sc, port, ready), daemon=True)
+    server.start()
+    runs = []
+    try:
+        if not ready.wait(10):
+            raise RuntimeError("stand-in server did not start")
+        with tempfile.TemporaryDirectory() as tmp:
+            text = os.path.join(tmp, f"{name}.txt")
+            with open(text, "w") as f:
+                f.write("\n".join(ground_truth(sc)[0]) + "\n")
+            words_file = shark_wordlist.compile_wordlists([text], text + ".sbw")
+            for _ in range(repeat):
+                q = ctx.Queue()
+                p = ctx.Process(target=run_case, args=(sc, profile, port, words_file, q))
+                p.start()
+                runs.append(q.get())
+                p.join()
+    finally:
+        server.terminate()
+        server.join()
+    # the median run by throughput stands for the case
+    runs.sort(key=lambda r: r["rps"])
+    return dict(runs[len(runs) // 2], runs=len(runs))
+
+
+def revision():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old, new):
+    # relative change per case for the numbers that matter, + is better
+    for key, cur in new["results"].items():
+        prev = old["results"].get(key)
+        if not prev:
+            continue
+        parts = []
+        for m, better in (("rps", 1), ("p95_ms", -1), ("cpu_s", -1), ("peak_rss_kb", -1),
+                          ("precision", 1), ("recall", 1)):
+            if prev[m]:
+                d = (cur[m] - prev[m]) / prev[m] * 100 * better
+                parts.append(f"{m} {d:+.1f}%")
+        print(f"{key:20} " + "  ".join(parts))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="benchmark the scan engine against a local stand-in target")
+    ap.add_argument("--scenario", default=",".join(SCENARIOS), help="comma separated, from: " + ", ".join(SCENARIOS))
+    ap.add_argument("--profile", default=",".join(PROFILES), help="comma separated, from: " + ", ".join(PROFILES))
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case, the median is kept")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--out", help="results file (default bench/<revision>-<time>.json)")
+    ap.add_argument("--compare", help="earlier results file to diff against")
+    a = ap.parse_args()
+    results = {}
+    for name in a.scenario.split(","):
+        for profile in a.profile.split(","):
+            key = f"{name}/{profile}"
+            r = results[key] = bench(name, profile, a.repeat, a.port)
+            print(f"{key:20} {r['rps']:8.0f} req/s  p50 {r['p50_ms']:6.1f}ms  p95 {r['p95_ms']:6.1f}ms  "
+                  f"p99 {r['p99_ms']:6.1f}ms  cpu {r['cpu_s']:5.2f}s  rss {r['peak_rss_kb'] // 1024}MB  "
+                  f"precision {r['precision']:.2f}  recall {r['recall']:.2f}")
+    rev = revision()
+    doc = {
+        "revision": rev,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": a.repeat,
+        "scenarios": {n: SCENARIOS[n] for n in a.scenario.split(",")},
+        "results": results,
+    }
+    out = a.out or os.path.join("bench", f"{rev or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(doc, f, indent=1)
+    print(f"results in {out}")
+    if a.compare:
+        with open(a.compare) as f:
+            compare(json.load(f), doc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+class SingleFlight:
+    # request coalescing: concurrent calls for the same key share one
+    # in-flight call. With keep=True the result stays cached, so each key
+    # is only ever fetched once for the lifetime of the object
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.calls = 0
+        self.shared = 0
+        self._futs = {}
+
+    async def do(self, key, fn):
+        fut = self._futs.get(key)
+        if fut is None:
+            self.calls += 1
+            fut = asyncio.ensure_future(fn())
+            self._futs[key] = fut
+            if not self.keep:
+                fut.add_done_callback(lambda _: self._futs.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: one caller being cancelled must not cancel the others
+        return await asyncio.shield(fut)
+
+    def forget(self, key):
+        self._futs.pop(key, None)
+
+
+class DiskCache:
+    # small persistent LRU: one JSON file, loaded on first use and
+    # rewritten (write-then-rename) after every change. Entries older than
+    # `ttl` are stale; past max_entries or max_bytes the least recently
+    # used go first. Reads reorder in memory, the order reaches the file
+    # with the next put
+    def __init__(self, path, ttl=7 * 86400, max_entries=2000, max_bytes=4 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items = None
+        self._bytes = 0
+
+    def _load(self):
+        if self._items is not None:
+            return self._items
+        self._items = OrderedDict()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for k, t, v in json.load(f):
+                    self._items[k] = (t, v)
+        except (OSError, ValueError, TypeError):
+            pass
+        self._bytes = sum(self._size(k, v) for k, (_, v) in self._items.items())
+        return self._items
+
+    @staticmethod
+    def _size(k, v):
+        return len(k) + len(json.dumps(v))
+
+    def get(self, key, stale=False):
+        # the value, or None when missing (or expired, unless stale=True)
+        items = self._load()
+        hit = items.get(key)
+        if hit is None or (not stale and time.time() - hit[0] > self.ttl):
+            return None
+        items.move_to_end(key)
+        return hit[1]
+
+    def put(self, key, value):
+        items = self._load()
+        old = items.pop(key, None)
+        if old is not None:
+            self._bytes -= self._size(key, old[1])
+        items[key] = (time.time(), value)
+        self._bytes += self._size(key, value)
+        while items and (len(items) > self.max_entries or self._bytes > self.max_bytes):
+            k, (_, v) = items.popitem(last=False)
+            self._bytes -= self._size(k, v)
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([[k, t, v] for k, (t, v) in self._items.items()], f)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self._load())
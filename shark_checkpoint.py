@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import time
+
+import shark_dirs
+
+VERSION = 1
+
+
+def path_for(target, wordlist_signature):
+    key = hashlib.blake2b(f"{target}\0{wordlist_signature}".encode(), digest_size=8)
+    return shark_dirs.cache_dir("checkpoints", key.hexdigest() + ".json")
+
+
+class Progress:
+    # completion tracker for an indexed wordlist: every index below `low`
+    # is done, `done` holds the finished indices above it. Whatever lies
+    # between low and the feeder position and is not in `done` was in
+    # flight and gets sent again on resume
+    def __init__(self, low=0, done=()):
+        self.low = low
+        self.done = set(done)
+        self.completed = low + len(self.done)
+
+    def skip(self, i):
+        return i < self.low or i in self.done
+
+    def finish(self, i):
+        self.completed += 1
+        if i != self.low:
+            self.done.add(i)
+            return
+        self.low += 1
+        while self.low in self.done:
+            self.done.remove(self.low)
+            self.low += 1
+
+    def state(self):
+        return {"low": self.low, "done": sorted(self.done)}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["low"], state["done"])
+
+
+def save(path, state):
+    # write-then-rename so a kill mid-write leaves the previous checkpoint
+    state = dict(state, version=VERSION, saved=time.time())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(path):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != VERSION:
+        return None
+    return state
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,21 @@
+import os
+
+# where sharkbuster keeps its files, per the XDG base directory spec:
+# <XDG dir>/sharkbuster joined with parts
+
+
+def _dir(var, default, parts):
+    root = os.environ.get(var) or os.path.join(os.path.expanduser("~"), *default)
+    return os.path.join(root, "sharkbuster", *parts)
+
+
+def cache_dir(*parts):
+    return _dir("XDG_CACHE_HOME", (".cache",), parts)
+
+
+def data_dir(*parts):
+    return _dir("XDG_DATA_HOME", (".local", "share"), parts)
+
+
+def config_dir(*parts):
+    return _dir("XDG_CONFIG_HOME", (".config",), parts)
@@ -0,0 +1,988 @@
+import asyncio
+import heapq
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import aiohttp
+
+import shark_checkpoint
+import shark_metrics
+import shark_net
+import shark_rank
+import shark_wordlist
+from shark_fingerprint import SoftNotFound, body_hash, tech
+from shark_limiter import AdaptiveLimiter
+from shark_probe import MAX_BODY, Probe
+from shark_sink import ResultSink, make_record
+
+REDIRECTS = (301, 302, 307)
+RETRY_STATUS = (429, 503)
+VALID = (200, 301, 302, 307, 401, 403, 429)
+BORING_REDIRECTS = ("/", "/login", "/index.php")
+DIR_STATUS = {200: 0, 301: 1, 302: 1, 307: 1, 401: 3, 403: 3}
+HOT_DIRS = ("admin", "backup", "api", "private", "config", "upload", "internal",
+            "dev", "test", "old", "db", "secret", ".git")
+
+# probe decision and soft-404 index per (target, probe mode), so a target
+# scanned again by the same process (launcher menu, Shark4 then Shark3)
+# skips calibration for calibration_ttl seconds
+CALIBRATIONS = {}
+
+
+class Options:
+    # every knob of a scan. The interactive tools only fill these in, so
+    # anything they can do is reachable from code as well. Nothing is
+    # written to disk unless results_file or checkpoint is set
+    def __init__(self, concurrency=200, min_concurrency=8, start_concurrency=50,
+                 max_workers=1000, calibrate_hosts=20, probe_mode="auto",
+                 max_body=MAX_BODY, timeout=3.7, valid=VALID,
+                 boring_redirects=BORING_REDIRECTS, filters=None, max_depth=0,
+                 processes=1, checkpoint=False, checkpoint_interval=10,
+                 results_file=None, results_dir="results",
+                 user_agents=(), sources=(), progress=False, stats_file=None,
+                 stats_interval=5.0, trace=False, calibration_ttl=600, connection=None,
+                 retries=3, retry_backoff=0.5, retry_max_delay=60.0,
+                 retry_status=RETRY_STATUS, retry_every=8, order=None,
+                 budget_paths=0, budget_time=0):
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.start_concurrency = start_concurrency
+        self.max_workers = max_workers
+        self.calibrate_hosts = calibrate_hosts
+        self.probe_mode = probe_mode
+        self.max_body = max_body
+        self.timeout = timeout
+        self.valid = tuple(valid)
+        self.boring_redirects = tuple(boring_redirects)
+        self.filters = filters
+        self.max_depth = max_depth
+        self.processes = processes
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.results_file = results_file
+        self.results_dir = results_dir
+        self.user_agents = tuple(user_agents)
+        self.sources = [os.path.abspath(x) for x in sources]
+        self.progress = progress
+        self.stats_file = stats_file
+        self.stats_interval = stats_interval
+        self.trace = trace
+        self.calibration_ttl = calibration_ttl
+        self.connection = connection or shark_net.DEFAULT
+        # timeouts, connection errors and retry_status answers are sent
+        # again up to `retries` times, backoff doubling from retry_backoff;
+        # every retry_every-th pick of a target may be a due retry, the
+        # rest is fresh work
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_delay = retry_max_delay
+        self.retry_status = tuple(retry_status)
+        self.retry_every = max(1, retry_every)
+        # order(base, words) -> indices of words to try first on that
+        # target (see shark_rank.head), None or [] keeps the file order
+        self.order = order
+        # stop a target after budget_paths wordlist paths (retries and
+        # re-fetches don't count), and every target budget_time seconds
+        # into the run; 0 is no limit. A stopped target is not finished,
+        # its checkpoint resumes the rest
+        self.budget_paths = budget_paths
+        self.budget_time = budget_time
+
+
+def normalize_target(t):
+    t = t.strip()
+    if not t.startswith(("http://", "https://")):
+        t = "https://" + t
+    return t.rstrip("/") + "/"
+
+
+def read_targets(t, log=None):
+    # a host or url, or a file of them for batch mode, one per line with
+    # "#" comments: normalized and de-duplicated. A line that names no
+    # host is logged and left out
+    log = log or (lambda kind, msg: None)
+    if os.path.isfile(t):
+        with open(t, errors="ignore") as f:
+            raw = [x.strip() for x in f if x.strip() and not x.lstrip().startswith("#")]
+    else:
+        raw = [t.strip()]
+    out = []
+    for x in raw:
+        base = normalize_target(x)
+        if urlparse(base).hostname:
+            out.append(base)
+        else:
+            log("error", f"invalid target: {x}")
+    out = list(dict.fromkeys(out))
+    if os.path.isfile(t):
+        log("info", f"batch mode: {len(out)} targets")
+    return out
+
+
+def retry_after(value):
+    # Retry-After as seconds from now, either form; None when absent or bad
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class Retry:
+    # check()'s answer for a request worth sending again later
+    __slots__ = ("reason", "after")
+
+    def __init__(self, reason, after=None):
+        self.reason = reason
+        self.after = after
+
+
+def make_session(limit=100, per_host=0, user_agents=(), metrics=None, trace=False,
+                 policy=None, **kw):
+    connector = (policy or shark_net.DEFAULT).connector(limit, per_host)
+    headers = {"User-Agent": random.choice(user_agents)} if user_agents else None
+    if metrics is not None:
+        kw["trace_configs"] = [metrics.trace_config(trace)]
+    return aiohttp.ClientSession(connector=connector, headers=headers, **kw)
+
+
+# filter stages: (scan, path, response) -> True drops the response. They
+# run in order after the request, cheapest first
+def status_filter(scan, p, r):
+    return r.status not in scan.opts.valid
+
+
+def redirect_filter(scan, p, r):
+    # bounced back to the front page or a login, not a finding
+    if r.status in REDIRECTS:
+        return r.headers.get("Location", "").lower() in scan.opts.boring_redirects
+    return False
+
+
+def soft404_filter(scan, p, r):
+    return scan.soft404.is_soft404(p, r)
+
+
+FILTERS = (status_filter, redirect_filter, soft404_filter)
+
+
+class Stride:
+    # shard k of n of a wordlist: items k, k + n, k + 2n, ... Interleaved
+    # rather than contiguous, so every shard starts at the top of a
+    # ranked list and a budget split over the shards covers its head
+    def __init__(self, words, k, n):
+        self.words = words
+        self.k = k
+        self.n = n
+        self.size = len(range(k, len(words), n))
+
+    def __len__(self):
+        return self.size
+
+    def index(self, i):
+        # where item i is in the whole wordlist
+        return self.k + i * self.n
+
+    def __getitem__(self, i):
+        return self.words[self.k + i * self.n]
+
+
+class HostScan:
+    # everything one target needs: its own probe decision, soft-404
+    # index, in-flight window, output file and wordlist position. The
+    # session, the wordlist and the worker pool are shared. With
+    # shard=(k, n) it covers every n-th wordlist item from the k-th
+    # (see Stride), its share of the budget and 1/n of the per-host window
+    def __init__(self, engine, host, shard=(0, 1)):
+        k, n = shard
+        opts = engine.opts
+        self.engine = engine
+        self.opts = opts
+        self.shard = shard
+        self.base = normalize_target(host)
+        self.results_file = engine.results_path(self.base)
+        key = engine.signature
+        if n > 1:
+            if self.results_file:
+                self.results_file += f".shard{k}"
+            key += f":{k}%{n}"
+        # opened by calibrate(), once it is settled whether this resumes
+        self.sink = None
+        self.ckpt_file = None
+        self.resume = None
+        if opts.checkpoint and engine.signature:
+            self.ckpt_file = shark_checkpoint.path_for(self.base, key)
+            self.resume = shark_checkpoint.load(self.ckpt_file)
+        # a resumed scan keeps the order its checkpoint was made in
+        if self.resume and "order" in self.resume:
+            self.order = self.resume["order"]
+        else:
+            self.order = engine.order_for(self.base)
+        words = shark_rank.reorder(engine.words, self.order)
+        self.words = Stride(words, k, n) if n > 1 else words
+        # budget_paths split exactly, the shards together send that many
+        self.budget = None
+        if opts.budget_paths:
+            self.budget = opts.budget_paths // n + (k < opts.budget_paths % n)
+        self.probe = Probe(opts.probe_mode, opts.max_body)
+        self.soft404 = SoftNotFound()
+        self.preset = None
+        self.limiter = AdaptiveLimiter(max(1, opts.start_concurrency // n),
+                                       max(1, opts.min_concurrency // n),
+                                       max(1, opts.concurrency // n),
+                                       on_change=self.report_window)
+        self.timeout = aiohttp.ClientTimeout(total=opts.timeout)
+        self.tech = ""
+        self.progress = shark_checkpoint.Progress()
+        # recursion: dirs[k] is the prefix scanned in the k-th pass over
+        # the wordlist, so item v is dirs[v // len(words)] + words[v % len(words)]
+        self.dirs = [""]
+        self.frontier = []
+        self.visited = {""}
+        self.cursor = 0
+        self.pending = 0
+        self.exhausted = False
+        self.started = False
+        self.finished = False
+        self.stopped = False
+        self.issued = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hits = 0
+        # urls recorded so far
+        self.seen = set()
+        # deferred retries as (due, item, path), a heap; attempts per item
+        self.retries = []
+        self.attempts = {}
+        self.unresolved = []
+        self.hold_until = 0.0
+        self.picks = 0
+        # set by the scheduler: wakes it when a parked retry comes due
+        self.wake = None
+
+    def report_window(self, old, new, reason):
+        if new < old:
+            who = f"{self.base} " if len(self.engine.hosts) > 1 else ""
+            self.engine.log("warn", f"[*] {who}concurrency {old} -> {new}: {reason}")
+
+    def checkpoint(self):
+        if not self.ckpt_file:
+            return
+        shark_checkpoint.save(self.ckpt_file, {
+            "target": self.base,
+            "wordlist": {
+                "files": self.opts.sources,
+                "signature": self.engine.signature,
+                "count": len(self.words),
+                "shard": list(self.shard),
+            },
+            "order": self.order,
+            "tech": self.tech,
+            "progress": self.progress.state(),
+            "completed": self.progress.completed,
+            "probe": {"use_head": self.probe.use_head},
+            "recursion": {
+                "dirs": self.dirs,
+                "frontier": self.frontier,
+                "visited": sorted(self.visited),
+            },
+            "soft404": self.soft404.to_dict(),
+            "unresolved": self.unresolved,
+            "results": {
+                "path": os.path.abspath(self.results_file) if self.sink else None,
+                "offset": self.sink.tell() if self.sink else 0,
+                "hits": self.hits,
+            },
+        })
+
+    async def calibrate(self, session):
+        if self.results_file and self.sink is None:
+            self.sink = ResultSink(self.results_file, append=bool(self.resume))
+        if self.resume:
+            # calibration is part of the saved state, and hits recorded
+            # after the checkpoint belong to requests that are re-sent
+            self.progress = shark_checkpoint.Progress.from_state(self.resume["progress"])
+            self.probe.use_head = self.resume["probe"]["use_head"]
+            self.tech = self.resume.get("tech", "")
+            self.soft404 = SoftNotFound.from_dict(self.resume["soft404"])
+            rec = self.resume.get("recursion")
+            if rec:
+                self.dirs = rec["dirs"]
+                self.frontier = [tuple(x) for x in rec["frontier"]]
+                heapq.heapify(self.frontier)
+                self.visited = set(rec["visited"])
+            self.unresolved = self.resume.get("unresolved", [])
+            res = self.resume["results"]
+            if self.sink and res["path"] == os.path.abspath(self.results_file):
+                cut = self.sink.truncate(res["offset"])
+                with open(self.results_file, encoding="utf-8") as f:
+                    urls = [json.loads(line)["url"] for line in f if line.strip()]
+                self.seen = set(urls)
+                # cut short since the checkpoint: count what is left
+                self.sink.count = self.hits = res["hits"] if cut else len(urls)
+        elif self.preset is not None:
+            self.probe.use_head, self.soft404, self.tech = self.preset
+        else:
+            key = (self.base, self.opts.probe_mode)
+            cached = CALIBRATIONS.get(key)
+            if cached and time.monotonic() - cached[0] < self.opts.calibration_ttl:
+                self.probe.use_head, self.soft404, self.tech = cached[1:]
+            else:
+                await self.probe.calibrate(session, self.base, timeout=self.timeout)
+
+                async def sample(url):
+                    r = await self.probe.fetch(session, url, get=True, timeout=self.timeout,
+                                               headers=self.headers())
+                    if r is not None and not self.tech:
+                        self.tech = tech(r.headers)
+                    return r
+                await self.soft404.calibrate(self.base, sample)
+                if self.soft404.profiles:
+                    CALIBRATIONS[key] = (time.monotonic(), self.probe.use_head, self.soft404,
+                                         self.tech)
+        self.started = bool(self.soft404.profiles)
+        if not self.started and self.preset is None:
+            self.engine.log("error", f"[!] {self.base} did not answer, skipped")
+        self.cursor = self.progress.low
+
+    def headers(self):
+        if self.opts.user_agents:
+            return {"User-Agent": random.choice(self.opts.user_agents)}
+        return None
+
+    def discover(self, p, rec):
+        # queue a found directory for its own pass over the wordlist,
+        # shallow, reachable and interesting-looking names first
+        max_depth = self.opts.max_depth
+        if not max_depth or rec["status"] not in DIR_STATUS:
+            return
+        loc = rec["location"]
+        if p.endswith("/"):
+            d = p
+        elif loc and loc.rstrip("/").endswith("/" + p.lower()) and loc.endswith("/"):
+            d = p + "/"
+        else:
+            return
+        d = re.sub("/+", "/", d)
+        depth = d.count("/")
+        if depth > max_depth or d in self.visited:
+            return
+        self.visited.add(d)
+        name = d.rstrip("/").rsplit("/", 1)[-1].lower()
+        score = depth * 10 + DIR_STATUS[rec["status"]] - (5 if any(h in name for h in HOT_DIRS) else 0)
+        heapq.heappush(self.frontier, (score, len(self.visited), d))
+        self.engine.log("dir", f"[dir] {self.base}{d} queued (depth {depth})")
+
+    def has_room(self):
+        return (self.limiter.inflight < self.limiter.window
+                and (not self.hold_until or time.monotonic() >= self.hold_until))
+
+    def next_item(self):
+        # fresh work first, a due retry on every retry_every-th pick and
+        # whenever there is nothing fresh
+        deadline = self.engine.deadline
+        if deadline and time.monotonic() >= deadline:
+            self.stop("time budget used up")
+        if self.exhausted:
+            return None
+        self.picks += 1
+        if self.retries and self.picks % self.opts.retry_every == 0:
+            item = self.due_retry()
+            if item is not None:
+                return item
+        item = self.next_fresh()
+        if item is None and self.retries:
+            item = self.due_retry()
+        return item
+
+    def stop(self, why, drain=False):
+        # out of budget: no new path is sent and the target stays
+        # unfinished. drain lets parked retries of sent paths finish
+        # first, otherwise only what is in flight still lands
+        if not self.stopped:
+            self.stopped = True
+            if self.shard[0] == 0:
+                self.engine.log("warn", f"[*] {self.base}: {why}")
+        if not drain or not self.pending:
+            self.exhausted = True
+
+    def due_retry(self):
+        if self.retries and self.retries[0][0] <= time.monotonic():
+            _, i, p = heapq.heappop(self.retries)
+            return i, p
+        return None
+
+    def defer(self, i, p, retry):
+        # park a failed item for another try, False once it has had all
+        # of them (it is then listed as unresolved). Parked items stay
+        # pending, so the target can't finish and a checkpoint resends them
+        n = self.attempts.get(i, 0) + 1
+        if n > self.opts.retries:
+            self.attempts.pop(i, None)
+            self.unresolved.append([p, retry.reason])
+            self.engine.metrics.unresolved += 1
+            return False
+        self.attempts[i] = n
+        # exponential backoff with jitter over the upper half, so retries
+        # of a burst of failures don't come back in step
+        delay = min(self.opts.retry_max_delay, self.opts.retry_backoff * 2 ** (n - 1))
+        delay *= random.uniform(0.5, 1.0)
+        if retry.after is not None:
+            # the server asked the whole host to wait
+            delay = max(delay, min(retry.after, self.opts.retry_max_delay))
+            self.hold_until = max(self.hold_until, time.monotonic() + delay)
+        heapq.heappush(self.retries, (time.monotonic() + delay, i, p))
+        self.engine.metrics.retries += 1
+        if self.wake is not None:
+            asyncio.get_running_loop().call_later(delay, self.wake)
+        return True
+
+    def next_fresh(self):
+        # None with exhausted unset means "nothing right now": items still
+        # in flight may queue more directories
+        n = len(self.words)
+        while True:
+            if self.cursor >= len(self.dirs) * n:
+                if self.frontier:
+                    self.dirs.append(heapq.heappop(self.frontier)[2])
+                    continue
+                if not self.pending:
+                    self.exhausted = True
+                    self.maybe_finish()
+                return None
+            v = self.cursor
+            self.cursor += 1
+            if self.progress.skip(v):
+                continue
+            w = self.words[v % n]
+            if w is None:
+                # an expansion variant that does not apply to this word
+                self.progress.finish(v)
+                continue
+            if self.budget is not None and self.issued >= self.budget:
+                # not sent, a resume starts here
+                self.cursor = v
+                self.stop(f"budget of {self.opts.budget_paths} paths used up", drain=True)
+                return None
+            self.issued += 1
+            self.pending += 1
+            return v, self.dirs[v // n] + w
+
+    def done(self, i):
+        self.progress.finish(i)
+        self.pending -= 1
+        self.maybe_finish()
+
+    def maybe_finish(self):
+        if self.exhausted and not self.pending and not self.finished and not self.stopped:
+            self.finished = True
+            if self.sink:
+                self.sink.flush()
+            if self.ckpt_file:
+                shark_checkpoint.remove(self.ckpt_file)
+
+    def record(self, i, rec):
+        # False for a url already recorded: an expansion variant can
+        # spell the same path as a wordlist entry ("config" + ".php")
+        if rec["url"] in self.seen:
+            return False
+        self.seen.add(rec["url"])
+        rec["index"] = self.words.index(i) if self.shard[1] > 1 else i
+        self.hits += 1
+        if self.sink:
+            self.sink.write(rec)
+        return True
+
+    async def fetch(self, session, p, get=False):
+        return (await self._fetch(session, p, get))[0]
+
+    async def fetch_retry(self, session, p, get=False):
+        # fetch() with the scan's retry policy applied inline, for one-off
+        # requests outside the wordlist (Shark3's passive checks)
+        for n in range(self.opts.retries + 1):
+            r, why = await self._fetch(session, p, get)
+            if r is not None and r.status not in self.opts.retry_status:
+                return r
+            if n == self.opts.retries:
+                return r
+            after = retry_after(r.headers.get("Retry-After")) if r is not None else None
+            delay = min(self.opts.retry_max_delay, self.opts.retry_backoff * 2 ** n)
+            await asyncio.sleep(max(delay * random.uniform(0.5, 1.0),
+                                    min(after or 0.0, self.opts.retry_max_delay)))
+
+    async def _fetch(self, session, p, get=False):
+        # (response, None) or (None, "timeout" / the exception's name)
+        metrics = self.engine.metrics
+        ctx = metrics.request_ctx()
+        kw = {} if ctx is None else {"trace_request_ctx": ctx}
+        async with self.limiter:
+            t0 = time.monotonic()
+            self.requests += 1
+            try:
+                r = await self.probe.fetch(session, self.base + p, get=get,
+                                           timeout=self.timeout, headers=self.headers(), **kw)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                latency = time.monotonic() - t0
+                self.limiter.record(latency, timeout=True)
+                metrics.observe(latency, timeout=True)
+                return None, "timeout"
+            except Exception as e:
+                self.errors += 1
+                latency = time.monotonic() - t0
+                self.limiter.record(latency, error=True)
+                metrics.observe(latency, error=True)
+                metrics.exception(e)
+                return None, type(e).__name__
+            latency = time.monotonic() - t0
+            self.limiter.record(latency, r.status)
+            metrics.observe(latency, r.status, len(r.body), ctx=ctx)
+            return r, None
+
+    def classify(self, p, r):
+        # the Location to record for a finding, None when a filter stage
+        # drops the response
+        for f in self.engine.filters:
+            if f(self, p, r):
+                return None
+        location = r.headers.get("Location", "").lower() if r.status in REDIRECTS else ""
+        return location
+
+    async def check(self, session, p):
+        # a record, None for a miss, or Retry when the answer was a
+        # timeout, an error or a throttle and retries are on
+        try:
+            t0 = time.monotonic()
+            r, why = await self._fetch(session, p)
+            if r is not None and self.soft404.needs_body(p, r):
+                r, why = await self._fetch(session, p, get=True)
+            if r is None:
+                return Retry(why) if self.opts.retries else None
+            if r.status in self.opts.retry_status and self.opts.retries:
+                return Retry(str(r.status), retry_after(r.headers.get("Retry-After")))
+            location = self.classify(p, r)
+            if location is None:
+                return None
+            return make_record(self.base + p, r.status, r.length, location,
+                               time.monotonic() - t0, r.truncated, body_hash(p, r))
+        except Exception as e:
+            # a broken filter stage or a bad response, counted not raised
+            self.engine.metrics.exception(e)
+            return None
+
+
+class FairScheduler:
+    # round-robin over the targets that still have paths, skipping any
+    # target whose window is full so a slow host can't hold the pool
+    def __init__(self, scans):
+        self.active = deque(s for s in scans if s.started)
+        self.room = asyncio.Event()
+        for scan in self.active:
+            scan.limiter.on_release = self.room.set
+            scan.wake = self.room.set
+
+    async def next(self):
+        while self.active:
+            for _ in range(len(self.active)):
+                scan = self.active[0]
+                self.active.rotate(-1)
+                if not scan.has_room():
+                    continue
+                item = scan.next_item()
+                if item is None:
+                    if scan.exhausted:
+                        self.active.pop()
+                        if not self.active:
+                            return None
+                    continue
+                return scan, item
+            self.room.clear()
+            await self.room.wait()
+        return None
+
+
+class Engine:
+    # wordlist scan of one or many targets. run() and stream() are the
+    # programmatic entry points, Shark3 and Shark4 are front-ends over
+    # them. log(kind, message) gets progress notes, kind is one of
+    # "info", "warn", "error" or "dir"
+    def __init__(self, targets, words, options=None, log=None):
+        self.opts = options or Options()
+        self.words = words
+        sig = getattr(words, "signature", None)
+        self.signature = sig.hex() if sig else None
+        self.log = log or (lambda kind, msg: None)
+        self.metrics = shark_metrics.Metrics()
+        self.metrics.trace_stages = self.opts.trace
+        self.progress_line = None
+        self._exported = 0.0
+        # set in a shard child: snapshots go to the parent instead
+        self.report_to = None
+        self.deadline = 0.0
+        self.orders = {}
+        self.filters = tuple(self.opts.filters or FILTERS)
+        self.hosts = list(dict.fromkeys(normalize_target(t) for t in targets))
+        n = max(1, self.opts.processes)
+        if self.opts.max_depth and n > 1:
+            self.log("warn", "recursive scans share one frontier, running in one process")
+            n = self.opts.processes = 1
+        self.scans = [HostScan(self, h, (k, n)) for h in self.hosts for k in range(n)]
+        # the scans this process runs, one shard's worth in a child
+        self.active = self.scans
+
+    def order_for(self, base):
+        # one order per target, shared by its shards
+        if self.opts.order is None:
+            return None
+        if base not in self.orders:
+            self.orders[base] = self.opts.order(base, self.words) or None
+        return self.orders[base]
+
+    def results_path(self, base):
+        if not self.opts.results_file:
+            return None
+        if len(self.hosts) == 1:
+            return self.opts.results_file
+        os.makedirs(self.opts.results_dir, exist_ok=True)
+        netloc = urlparse(base).netloc.replace(":", "_")
+        return os.path.join(self.opts.results_dir, netloc + ".jsonl")
+
+    def resumable(self):
+        return [s for s in self.scans if s.resume]
+
+    def make_session(self):
+        workers = min(self.opts.max_workers, self.opts.concurrency * len(self.active))
+        return make_session(workers, self.opts.concurrency, self.opts.user_agents,
+                            self.metrics, self.opts.trace, self.opts.connection)
+
+    def snapshot(self):
+        snap = self.metrics.snapshot(
+            done=sum(s.progress.completed for s in self.active),
+            total=sum(len(s.dirs) * len(s.words) for s in self.active if s.started),
+            inflight=sum(s.limiter.inflight for s in self.active),
+            window=sum(s.limiter.window for s in self.active if s.started and not s.finished))
+        snap["dns"] = self.opts.connection.resolver.stats()
+        return snap
+
+    def show(self, snap, final=False):
+        # progress line and stats file, both throttled
+        if self.opts.progress:
+            if self.progress_line is None:
+                self.progress_line = shark_metrics.ProgressLine()
+            if final:
+                self.progress_line.finish(snap)
+            else:
+                self.progress_line.update(snap)
+        now = time.monotonic()
+        if self.opts.stats_file and (final or now - self._exported >= self.opts.stats_interval):
+            self._exported = now
+            shark_metrics.export(self.opts.stats_file, snap)
+
+    def clear_progress(self):
+        # call before printing anything while the progress line is up
+        if self.progress_line is not None:
+            self.progress_line.clear()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(0.5)
+            snap = self.snapshot()
+            if self.report_to is not None:
+                self.report_to(snap)
+            else:
+                self.show(snap)
+
+    async def _autosave(self):
+        while True:
+            await asyncio.sleep(self.opts.checkpoint_interval)
+            for scan in self.active:
+                if scan.started and not scan.finished:
+                    scan.checkpoint()
+
+    async def calibrate(self, session, scans=None):
+        gate = asyncio.Semaphore(self.opts.calibrate_hosts)
+
+        async def calibrate(scan):
+            async with gate:
+                await scan.calibrate(session)
+        await asyncio.gather(*(calibrate(s) for s in (scans or self.active)))
+
+    async def run(self, on_hit=None, session=None):
+        # on_hit(scan, record) is called for every finding as it comes in
+        if session is None:
+            async with self.make_session() as session:
+                return await self.run(on_hit, session)
+        self.metrics.started = time.monotonic()
+        if self.opts.budget_time:
+            self.deadline = self.metrics.started + self.opts.budget_time
+        await self.opts.connection.resolver.prefetch([s.base for s in self.active],
+                                                    self.opts.connection.family)
+        await self.calibrate(session)
+        sched = FairScheduler(self.active)
+        for scan in self.active:
+            if scan.sink:
+                scan.sink.start()
+        tasks = []
+        if self.opts.checkpoint:
+            tasks.append(asyncio.create_task(self._autosave()))
+        if self.opts.progress or self.opts.stats_file or self.report_to:
+            tasks.append(asyncio.create_task(self._report()))
+        workers = min(self.opts.max_workers, self.opts.concurrency * len(self.active))
+        try:
+            await asyncio.gather(*(self._worker(session, sched, on_hit) for _ in range(workers)))
+            for scan in self.active:
+                if scan.unresolved:
+                    self.log("warn", f"[*] {scan.base}: {len(scan.unresolved)} paths still "
+                                     f"failing after {self.opts.retries} retries")
+        finally:
+            for t in tasks:
+                t.cancel()
+            if self.report_to is not None:
+                self.report_to(self.snapshot())
+            else:
+                self.show(self.snapshot(), final=True)
+
+    async def stream(self, session=None):
+        # the same scan as an async iterator of records
+        q = asyncio.Queue()
+        task = asyncio.ensure_future(self.run(lambda scan, rec: q.put_nowait(rec), session))
+        task.add_done_callback(lambda _: q.put_nowait(None))
+        try:
+            while True:
+                rec = await q.get()
+                if rec is None:
+                    break
+                yield rec
+        finally:
+            if not task.done():
+                task.cancel()
+        await task
+
+    async def _worker(self, session, sched, on_hit):
+        while True:
+            job = await sched.next()
+            if job is None:
+                return
+            scan, (i, p) = job
+            rec = await scan.check(session, p)
+            if isinstance(rec, Retry):
+                if scan.defer(i, p, rec):
+                    continue
+                rec = None
+            if rec and scan.record(i, rec):
+                self.metrics.hits += 1
+                if on_hit:
+                    on_hit(scan, rec)
+                scan.discover(p, rec)
+            scan.done(i)
+            # finishing can unblock a target that was waiting on its last
+            # in-flight items for new directories
+            sched.room.set()
+
+    def close(self):
+        # checkpoint whatever is unfinished and close the result files,
+        # returns how many scans were checkpointed
+        saved = 0
+        for scan in self.active:
+            if scan.started and not scan.finished and scan.ckpt_file:
+                scan.checkpoint()
+                saved += 1
+            if scan.sink:
+                scan.sink.close()
+        return saved
+
+    def summary(self, scans=None):
+        scans = self.active if scans is None else scans
+        return {
+            "finished": [s.base for s in scans if s.finished],
+            "stopped": [s.base for s in scans if s.stopped],
+            "requests": sum(s.requests for s in scans),
+            "errors": sum(s.errors for s in scans),
+            "timeouts": sum(s.timeouts for s in scans),
+            "hits": sum(s.hits for s in scans),
+            "cpu": time.process_time(),
+            "unresolved": self.unresolved(scans),
+        }
+
+    def unresolved(self, scans=None):
+        # [url, reason] for every path that still failed after its retries
+        scans = self.active if scans is None else scans
+        return [[s.base + p, why] for s in scans for p, why in s.unresolved]
+
+    # -- several processes, one contiguous wordlist shard each
+
+    async def calibrate_shards(self):
+        # calibrate each target once in the parent, every shard starts from
+        # the same probe decision and soft-404 index
+        firsts = {}
+        for scan in self.scans:
+            if not scan.resume:
+                firsts.setdefault(scan.base, scan)
+        await self.opts.connection.resolver.prefetch(list(firsts), self.opts.connection.family)
+        async with make_session(user_agents=self.opts.user_agents, metrics=self.metrics,
+                                policy=self.opts.connection) as session:
+            await self.calibrate(session, list(firsts.values()))
+        for scan in self.scans:
+            first = firsts.get(scan.base)
+            if first is not None and not scan.resume:
+                scan.preset = (first.probe.use_head, first.soft404, first.tech)
+
+    def _run_shard(self, k, q):
+        self.active = [s for s in self.scans if s.shard[0] == k]
+        index = {id(s): n for n, s in enumerate(self.scans)}
+        self.report_to = lambda snap: q.put(("stats", k, snap))
+        try:
+            asyncio.run(self.run(lambda scan, rec: q.put(("hit", index[id(scan)], rec))))
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.close()
+            q.put(("done", k, self.summary()))
+
+    def finished_hosts(self, stats):
+        # targets whose every shard ran to the end
+        done = {}
+        for st in stats.values():
+            for base in st["finished"]:
+                done[base] = done.get(base, 0) + 1
+        return [b for b in self.hosts
+                if done.get(b, 0) == sum(1 for s in self.scans if s.base == b)]
+
+    def merge_shards(self, stats):
+        # one ordered, de-duplicated results file per target, written only
+        # once every shard of it has finished; otherwise the shard files and
+        # their checkpoints stay for the next resume
+        finished = self.finished_hosts(stats)
+        stopped = {b for st in stats.values() for b in st["stopped"]}
+        for base in self.hosts:
+            shards = [s for s in self.scans if s.base == base]
+            if not shards[0].results_file:
+                continue
+            if base not in finished:
+                if any(s.started or s.resume for s in shards):
+                    why = "stopped by its budget" if base in stopped else "interrupted"
+                    self.log("warn", f"[*] {base} {why}, shard results kept for resume")
+                else:
+                    for s in shards:
+                        os.remove(s.results_file)
+                continue
+            recs = {}
+            for s in shards:
+                with open(s.results_file) as f:
+                    for line in f:
+                        rec = json.loads(line)
+                        recs.setdefault(rec["url"], rec)
+            out = self.results_path(base)
+            with ResultSink(out) as sink:
+                for rec in sorted(recs.values(), key=lambda r: r["index"]):
+                    sink.write(rec)
+            for s in shards:
+                os.remove(s.results_file)
+            if recs:
+                self.log("info", f"\nsaved {len(recs)} results in {out}")
+
+    def run_parallel(self, on_hit=None):
+        # fork one child per shard; hits come back over a queue and are
+        # handed to on_hit here. Returns totals over all children
+        n = self.opts.processes
+        asyncio.run(self.calibrate_shards())
+        ctx = multiprocessing.get_context("fork")
+        q = ctx.Queue()
+        procs = [ctx.Process(target=self._run_shard, args=(k, q)) for k in range(n)]
+        t0 = time.time()
+        for p in procs:
+            p.start()
+        # the children own the scans from here on
+        for s in self.scans:
+            if s.sink:
+                s.sink.close()
+        self.active = []
+        stats = {}
+        snaps = {}
+        seen = set()
+
+        def handle(msg):
+            if msg[0] == "hit":
+                # two shards of a target can find the same url
+                scan = self.scans[msg[1]]
+                if on_hit and (scan.base, msg[2]["url"]) not in seen:
+                    seen.add((scan.base, msg[2]["url"]))
+                    on_hit(scan, msg[2])
+            elif msg[0] == "stats":
+                snaps[msg[1]] = msg[2]
+                self.show(shark_metrics.merge(snaps.values()))
+            else:
+                stats[msg[1]] = msg[2]
+
+        def drain(timeout):
+            try:
+                handle(q.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+        try:
+            while len(stats) < n and any(p.is_alive() for p in procs):
+                drain(0.5)
+        finally:
+            # children got the same Ctrl+C and checkpoint themselves, keep
+            # reading so none of them blocks on a full pipe while exiting
+            deadline = time.time() + 15
+            while len(stats) < n and time.time() < deadline and any(p.is_alive() for p in procs):
+                drain(0.2)
+            while True:
+                try:
+                    msg = q.get_nowait()
+                except queue.Empty:
+                    break
+                if msg[0] == "stats":
+                    snaps[msg[1]] = msg[2]
+                elif msg[0] == "done":
+                    stats[msg[1]] = msg[2]
+            for p in procs:
+                p.join(timeout=1)
+                if p.is_alive():
+                    p.terminate()
+            if snaps:
+                self.show(shark_metrics.merge(snaps.values()), final=True)
+            self.merge_shards(stats)
+        total = {k: sum(st[k] for st in stats.values())
+                 for k in ("requests", "errors", "timeouts", "hits", "cpu")}
+        total["unresolved"] = [u for st in stats.values() for u in st["unresolved"]]
+        total["finished"] = self.finished_hosts(stats)
+        total["stopped"] = [b for b in self.hosts if any(b in st["stopped"] for st in stats.values())]
+        total["elapsed"] = time.time() - t0
+        total["processes"] = n
+        return total
+
+
+async def scan(targets, words, on_hit=None, **options):
+    # one-call API: scan targets with a wordlist (a Wordlist, a list of
+    # paths, or a wordlist file name) and return the findings
+    if isinstance(words, str):
+        words = shark_wordlist.load(words)
+    engine = Engine(targets, words, Options(**options))
+    found = []
+
+    def hit(s, rec):
+        found.append(rec)
+        if on_hit:
+            on_hit(s, rec)
+    try:
+        await engine.run(hit)
+    finally:
+        engine.close()
+    return found
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+
+import shark_wordlist
+
+CASES = {"lower": str.lower, "upper": str.upper, "title": str.capitalize}
+
+
+def suffixes(values):
+    # "php" -> ".php"; "~", "/" and anything already dotted stay as given
+    out = []
+    for v in values:
+        v = v.strip()
+        if v:
+            out.append("." + v if v[0].isalnum() else v)
+    return tuple(dict.fromkeys(out))
+
+
+class Expansion:
+    # base words x prefixes x case rules x extensions x backup suffixes as
+    # one indexable, sliceable sequence; nothing is materialized. Item i
+    # is base word i // variants with variant i % variants taken apart
+    # mixed-radix as (prefix, case, extension, backup), so the bare word
+    # comes first and an index means the same thing on resume. Variants
+    # that make no sense (an extension on a directory or on a name that
+    # has one, a case rule that changes nothing) are None, the engine
+    # counts those done without sending anything
+    def __init__(self, words, extensions=(), backups=(), cases=(), prefixes=(),
+                 start=0, stop=None):
+        for c in cases:
+            if c not in CASES:
+                raise ValueError(f"unknown case rule {c!r}, use {', '.join(CASES)}")
+        self.base = words
+        self.prefixes = ("",) + tuple(p for p in dict.fromkeys(prefixes) if p)
+        self.cases = ("",) + tuple(dict.fromkeys(cases))
+        self.extensions = ("",) + suffixes(extensions)
+        self.backups = ("",) + suffixes(backups)
+        self.variants = (len(self.prefixes) * len(self.cases)
+                         * len(self.extensions) * len(self.backups))
+        self.total = len(words) * self.variants
+        self.start, self.stop, _ = slice(start, stop).indices(self.total)
+        sig = getattr(words, "signature", None)
+        self.signature = None
+        if sig is not None:
+            spec = json.dumps([self.prefixes, self.cases, self.extensions, self.backups])
+            self.signature = hashlib.blake2b(sig + spec.encode(), digest_size=8).digest()
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def item(self, n):
+        w, v = divmod(n, self.variants)
+        v, b = divmod(v, len(self.backups))
+        v, e = divmod(v, len(self.extensions))
+        p, c = divmod(v, len(self.cases))
+        word = self.base[w]
+        if c:
+            cased = CASES[self.cases[c]](word)
+            # the same spelling as an earlier case rule (or as is)
+            if cased == word or any(CASES[x](word) == cased for x in self.cases[1:c]):
+                return None
+            word = cased
+        if (e or b) and word.endswith("/"):
+            return None
+        if e and "." in word.rsplit("/", 1)[-1]:
+            return None
+        return self.prefixes[p] + word + self.extensions[e] + self.backups[b]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("expansion slices must be contiguous")
+            return Expansion(self.base, self.extensions[1:], self.backups[1:], self.cases[1:],
+                             self.prefixes[1:], self.start + start, self.start + stop)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.item(self.start + i)
+
+    def __iter__(self):
+        for n in range(self.start, self.stop):
+            w = self.item(n)
+            if w is not None:
+                yield w
+
+    def rebase(self, words):
+        # the same rules and range over other base words, e.g. the same
+        # words in another order
+        return Expansion(words, self.extensions[1:], self.backups[1:], self.cases[1:],
+                         self.prefixes[1:], self.start, self.stop)
+
+    def roots(self, path):
+        # the base words path could be a variant of, case rules aside
+        out = [path]
+        for p in self.prefixes[1:]:
+            if path.startswith(p):
+                out.append(path[len(p):])
+        for suffixes in (self.backups[1:], self.extensions[1:]):
+            for w in list(out):
+                for s in suffixes:
+                    if w.endswith(s):
+                        out.append(w[:-len(s)])
+        return [w for w in dict.fromkeys(out) if w]
+
+
+def factor(lines, extensions=(), backups=()):
+    # the lines that the rules cannot produce from another kept line,
+    # i.e. the base words Expansion needs to cover at least the same
+    # paths. Shorter lines are decided first, a root is always shorter
+    kept = set()
+    exts = suffixes(extensions)
+    baks = suffixes(backups)
+
+    def derived(line):
+        for b in ("",) + baks:
+            if b and not line.endswith(b):
+                continue
+            stem = line[:len(line) - len(b)] if b else line
+            for e in ("",) + exts:
+                if not (e or b):
+                    continue
+                if e and not stem.endswith(e):
+                    continue
+                root = stem[:len(stem) - len(e)] if e else stem
+                # only what Expansion.item would generate from root
+                if not root or root.endswith("/") or root not in kept:
+                    continue
+                if e and "." in root.rsplit("/", 1)[-1]:
+                    continue
+                return True
+        return False
+    for line in sorted(lines, key=len):
+        if not derived(line):
+            kept.add(line)
+    return [l for l in lines if l in kept]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="shrink a wordlist to base words that an expansion "
+                                             "(extensions x backup suffixes) covers again")
+    ap.add_argument("input")
+    ap.add_argument("out")
+    ap.add_argument("--ext", default="php,html", help="comma separated extensions")
+    ap.add_argument("--backup", default="bak,old,tar,tar.gz,zip,/",
+                    help="comma separated backup suffixes")
+    a = ap.parse_args()
+    lines = []
+    with open(a.input, errors="ignore") as f:
+        for line in f:
+            p = shark_wordlist.normalize(line)
+            if p is not None:
+                lines.append(p)
+    lines = list(dict.fromkeys(lines))
+    base = factor(lines, a.ext.split(","), a.backup.split(","))
+    with open(a.out, "w") as f:
+        f.write("\n".join(base) + "\n")
+    n = len(Expansion(base, a.ext.split(","), a.backup.split(",")))
+    print(f"{len(lines)} lines -> {len(base)} base words, {n} paths when expanded with "
+          f"--ext {a.ext} --backup {a.backup}")
+
+
+if __name__ == "__main__":
+    main()
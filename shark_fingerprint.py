@@ -0,0 +1,273 @@
+import asyncio
+import random
+import re
+import string
+import zlib
+from urllib.parse import quote
+
+import numpy as np
+
+EXTENSIONS = ("", "/", ".php", ".html", ".asp", ".aspx", ".jsp",
+              ".txt", ".json", ".bak", ".zip")
+DEPTHS = (1, 2)
+SAMPLE_LENGTHS = (6, 14, 24)
+MAX_DISTANCE = 3
+BANDS = 4
+LENGTH_SLACK = 4
+MAX_WORDS = 256
+NEAR_BYTES = 64
+BITS = np.arange(64, dtype=np.uint64)
+
+WORD_RE = re.compile(rb"\w+")
+DIGITS_RE = re.compile(rb"\d+")
+EXT_RE = re.compile(r"\.[a-z0-9]{1,5}$")
+PRODUCT_RE = re.compile(r"[a-z][a-z0-9._-]*")
+# a substring of any response header name or value -> the WAF or CDN
+WAFS = {"cloudflare": "cloudflare", "cf-ray": "cloudflare", "akamai": "akamai",
+        "sucuri": "sucuri", "incapsula": "imperva", "big-ip": "f5", "bigip": "f5",
+        "x-amz-cf-id": "cloudfront", "awselb": "aws-elb", "x-iinfo": "imperva"}
+
+
+def variant(path):
+    # which calibration profile a path belongs to: (extension, depth)
+    p = path.lstrip("/")
+    if p.endswith("/"):
+        ext = "/"
+        p = p.rstrip("/")
+    else:
+        m = EXT_RE.search(p.lower())
+        ext = m.group(0) if m else ""
+    depth = min(p.count("/") + 1, DEPTHS[-1])
+    return ext, depth
+
+
+def strip_echo(body, path):
+    # drop anything the error page may echo back about the request, plus
+    # digit runs so timestamps and request ids don't move the hash
+    p = path.strip("/")
+    if p:
+        last = p.rsplit("/", 1)[-1]
+        for s in sorted({p, quote(p), last, quote(last)}, key=len, reverse=True):
+            if len(s) >= 3:
+                body = body.replace(s.encode("utf-8", "ignore"), b"")
+    return DIGITS_RE.sub(b"0", body.lower())
+
+
+def simhash(words):
+    # bit i is set when more than half the words' 64-bit hashes have it,
+    # counted for all bits of all words at once
+    if not words:
+        return 0
+    h = np.fromiter((zlib.crc32(w) | zlib.crc32(w, 0x9E3779B9) << 32 for w in words),
+                    np.uint64, len(words))
+    ones = (h[:, None] >> BITS & np.uint64(1)).sum(axis=0)
+    return int((np.uint64(1) << BITS[2 * ones > len(words)]).sum())
+
+
+def fingerprint(path, r):
+    # (status, length bucket, words, lines, simhash, location) of a
+    # response body with the echoed path stripped. Kept on the response,
+    # the soft-404 check and the hit record share one computation
+    if r.fp is None:
+        r.fp = _fingerprint(path, r)
+    return r.fp
+
+
+def _fingerprint(path, r):
+    body = strip_echo(r.body or b"", path)
+    words = WORD_RE.findall(body)
+    uniq = list(dict.fromkeys(words))[:MAX_WORDS]
+    location = r.headers.get("Location", "") if r.headers else ""
+    p = path.strip("/")
+    if p and location:
+        location = location.replace(p, "")
+    return (r.status, len(body) // 32, len(words), body.count(b"\n"),
+            simhash(uniq), location.lower())
+
+
+def body_hash(path, r):
+    # simhash of a response body as 16 hex digits, None without a body;
+    # two bodies within MAX_DISTANCE bits are the same page
+    if not r.body:
+        return None
+    return "%016x" % fingerprint(path, r)[4]
+
+
+def distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def tech(headers):
+    # what a target runs, as far as its response headers say: sorted
+    # "server:nginx powered:php waf:cloudflare" tokens, versions dropped
+    if not headers:
+        return ""
+    tokens = set()
+    for name, kind in (("Server", "server"), ("X-Powered-By", "powered")):
+        m = PRODUCT_RE.match(headers.get(name, "").strip().lower())
+        if m:
+            tokens.add(f"{kind}:{m.group(0).rstrip('._-')}")
+    seen = " ".join(f"{k} {v}" for k, v in headers.items()).lower()
+    for sig, waf in WAFS.items():
+        if sig in seen:
+            tokens.add("waf:" + waf)
+    return " ".join(sorted(tokens))
+
+
+class Profile:
+    def __init__(self):
+        self.statuses = set()
+        self.bodied = set()
+        self.exact = set()
+        self.bands = {}
+        self.locations = set()
+        self.samples = {}
+        self.lengths = {}
+
+    def add(self, path, r):
+        fp = fingerprint(path, r)
+        status, bucket, words, lines, sh, location = fp
+        self.statuses.add(status)
+        if location:
+            self.locations.add((status, location))
+        if r.body or not r.length:
+            self.bodied.add(status)
+            self.exact.add((status, bucket, words, lines, location))
+            for i in range(BANDS):
+                key = (status, i, sh >> (i * 16) & 0xFFFF)
+                self.bands.setdefault(key, []).append(sh)
+        self.samples.setdefault(status, []).append((len(path.strip("/")), r.length))
+        self.fit(status)
+
+    def to_dict(self):
+        return {
+            "statuses": sorted(self.statuses),
+            "bodied": sorted(self.bodied),
+            "exact": sorted(self.exact),
+            "bands": [[k[0], k[1], k[2], v] for k, v in self.bands.items()],
+            "locations": sorted(self.locations),
+            "samples": [[k, v] for k, v in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        prof = cls()
+        prof.statuses = set(d["statuses"])
+        prof.bodied = set(d["bodied"])
+        prof.exact = {tuple(x) for x in d["exact"]}
+        prof.bands = {(s, i, v): hashes for s, i, v, hashes in d["bands"]}
+        prof.locations = {tuple(x) for x in d["locations"]}
+        prof.samples = {s: [tuple(p) for p in pts] for s, pts in d["samples"]}
+        for status in prof.samples:
+            prof.fit(status)
+        return prof
+
+    def fit(self, status):
+        # length ~ a + k * len(path) for pages that echo the path k times;
+        # bodyless (HEAD) responses are classified with this model alone
+        pts = self.samples[status]
+        xs = {x for x, _ in pts}
+        if len(xs) > 1:
+            (x0, y0), (x1, y1) = min(pts), max(pts)
+            k = round((y1 - y0) / (x1 - x0)) if x1 != x0 else 0
+        else:
+            k = 0
+        a = sum(y - k * x for x, y in pts) / len(pts)
+        slack = 2 * max(abs(y - k * x - a) for x, y in pts) + LENGTH_SLACK
+        self.lengths[status] = (a, k, slack)
+
+    def match(self, path, r):
+        if r.status not in self.statuses:
+            return False
+        location = r.headers.get("Location", "") if r.headers else ""
+        if location:
+            p = path.strip("/")
+            loc = (location.replace(p, "") if p else location).lower()
+            return (r.status, loc) in self.locations
+        if r.body and r.status in self.bodied:
+            status, bucket, words, lines, sh, loc = fingerprint(path, r)
+            if (status, bucket, words, lines, loc) in self.exact:
+                return True
+            for i in range(BANDS):
+                for other in self.bands.get((status, i, sh >> (i * 16) & 0xFFFF), ()):
+                    if bin(sh ^ other).count("1") <= MAX_DISTANCE:
+                        return True
+            return False
+        if r.status in self.lengths:
+            a, k, slack = self.lengths[r.status]
+            return abs(r.length - (a + k * len(path.strip("/")))) <= slack
+        return False
+
+    def near(self, path, r):
+        # a bodyless response just outside the length model of a status we
+        # have body samples for: only its body can tell
+        if r.body or r.status not in self.bodied or r.status not in self.lengths:
+            return False
+        if r.headers and r.headers.get("Location"):
+            return False
+        a, k, slack = self.lengths[r.status]
+        d = abs(r.length - (a + k * len(path.strip("/"))))
+        return slack < d <= 4 * slack + NEAR_BYTES
+
+
+def random_path(n, depth, ext):
+    segs = ["".join(random.choices(string.ascii_lowercase + string.digits, k=n))
+            for _ in range(depth)]
+    p = "/".join(segs)
+    return p + ext
+
+
+class SoftNotFound:
+    # soft-404 index built from random-path probes per (extension, depth)
+    # variant; is_soft404 does a handful of dict lookups per response
+    def __init__(self, extensions=EXTENSIONS, depths=DEPTHS):
+        self.extensions = extensions
+        self.depths = depths
+        self.profiles = {}
+
+    async def calibrate(self, base, fetch):
+        # fetch(url) -> ProbeResult or None, with a body: GET samples give
+        # both the body index and the length model HEAD results use
+        base = base.rstrip("/") + "/"
+        paths = [random_path(n, depth, ext)
+                 for ext in self.extensions
+                 for depth in self.depths
+                 for n in SAMPLE_LENGTHS]
+        got = await asyncio.gather(*(fetch(base + p) for p in paths),
+                                   return_exceptions=True)
+        for path, r in zip(paths, got):
+            if r is not None and not isinstance(r, BaseException):
+                self.add(path, r)
+        return self
+
+    def to_dict(self):
+        return {
+            "extensions": list(self.extensions),
+            "depths": list(self.depths),
+            "profiles": [[ext, depth, prof.to_dict()]
+                         for (ext, depth), prof in self.profiles.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        index = cls(tuple(d["extensions"]), tuple(d["depths"]))
+        for ext, depth, prof in d["profiles"]:
+            index.profiles[(ext, depth)] = Profile.from_dict(prof)
+        return index
+
+    def add(self, path, r):
+        self.profiles.setdefault(variant(path), Profile()).add(path, r)
+
+    def profile(self, path):
+        ext, depth = variant(path)
+        return (self.profiles.get((ext, depth))
+                or self.profiles.get(("", depth))
+                or self.profiles.get(("", 1)))
+
+    def needs_body(self, path, r):
+        prof = self.profile(path)
+        return prof is not None and prof.near(path, r)
+
+    def is_soft404(self, path, r):
+        prof = self.profile(path)
+        return prof is not None and prof.match(path, r)
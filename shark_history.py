@@ -0,0 +1,393 @@
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+import shark_dirs
+from shark_fingerprint import MAX_DISTANCE, distance
+
+# one row per scan, per (scan, target) with whether that target finished,
+# per path found and per report finding, plus the last tech fingerprint
+# seen on each target. Paths and findings are keyed on
+# (scan, target, ...) without rowids, so one target's rows of one scan are
+# a single index range however big the database gets. target_paths and
+# path_hits are kept up to date by every write: each path once per target
+# it was ever found on, and per path on how many targets it was found,
+# overall (token "") and with each tech token those targets run
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    wordlist TEXT
+);
+CREATE TABLE IF NOT EXISTS targets (
+    id INTEGER PRIMARY KEY,
+    base TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS scan_targets (
+    scan INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scan, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scan_targets_by_target ON scan_targets (target, completed, scan);
+CREATE TABLE IF NOT EXISTS paths (
+    scan INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    status INTEGER,
+    length INTEGER,
+    location TEXT,
+    fingerprint TEXT,
+    PRIMARY KEY (scan, target, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS findings (
+    scan INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    risk TEXT,
+    PRIMARY KEY (scan, target, title, detail)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS target_tech (
+    target INTEGER PRIMARY KEY,
+    tech TEXT NOT NULL,
+    seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS target_paths (
+    target INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (target, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS path_hits (
+    path TEXT NOT NULL,
+    token TEXT NOT NULL,
+    targets INTEGER NOT NULL,
+    PRIMARY KEY (path, token)
+) WITHOUT ROWID;
+"""
+# databases written before the path_hits aggregate get it filled once
+VERSION = 1
+COLUMNS = {"paths": "path, status, length, location, fingerprint",
+           "findings": "title, detail, risk"}
+BATCH = 500
+FLUSH_INTERVAL = 0.5
+
+
+def default_path():
+    return shark_dirs.data_dir("history.db")
+
+
+def connect(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    if db.execute("PRAGMA user_version").fetchone()[0] < VERSION:
+        upgrade(db)
+    return db
+
+
+def upgrade(db):
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        # another process may have done it while this one waited
+        if db.execute("PRAGMA user_version").fetchone()[0] < VERSION:
+            db.execute("INSERT OR IGNORE INTO target_paths SELECT DISTINCT target, path FROM paths")
+            db.execute("INSERT OR REPLACE INTO path_hits "
+                       "SELECT path, '', COUNT(*) FROM target_paths GROUP BY path")
+            for t, tech in db.execute("SELECT target, tech FROM target_tech").fetchall():
+                retoken(db, t, tech.split(), 1)
+            db.execute(f"PRAGMA user_version = {VERSION}")
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+
+
+def count_hits(db, paths, tokens, n=1):
+    # n more (or fewer) targets found each of paths, with each of tokens
+    rows = [(p, tok) for p in paths for tok in tokens]
+    db.executemany("INSERT OR IGNORE INTO path_hits VALUES (?, ?, 0)", rows)
+    db.executemany("UPDATE path_hits SET targets = targets + ? WHERE path = ? AND token = ?",
+                   [(n,) + r for r in rows])
+    if n < 0:
+        db.executemany("DELETE FROM path_hits WHERE path = ? AND token = ? AND targets <= 0", rows)
+
+
+def retoken(db, target, tokens, n):
+    # target started (n=1) or stopped (n=-1) running tokens
+    if tokens:
+        paths = [p for (p,) in db.execute("SELECT path FROM target_paths WHERE target = ?",
+                                          (target,))]
+        count_hits(db, paths, tokens, n)
+
+
+def target_id(db, base):
+    db.execute("INSERT OR IGNORE INTO targets (base) VALUES (?)", (base,))
+    return db.execute("SELECT id FROM targets WHERE base = ?", (base,)).fetchone()[0]
+
+
+def split_url(url, bases):
+    # (base, path) for a record url, against the scan's targets
+    for b in bases:
+        if url.startswith(b):
+            return b, url[len(b):]
+    p = urlparse(url)
+    return f"{p.scheme}://{p.netloc}/", p.path.lstrip("/")
+
+
+class HistoryWriter:
+    # records one scan into the history database. The scan row is made
+    # up front; paths and findings go onto a queue and a writer thread
+    # inserts them in batches of up to BATCH rows, one transaction each,
+    # so the scan loop only ever does a queue put
+    def __init__(self, tool, targets, wordlist="", path=None):
+        self.path = path or default_path()
+        self.bases = list(targets)
+        self.techs = {}
+        db = connect(self.path)
+        with db:
+            cur = db.execute("INSERT INTO scans (tool, started, wordlist) VALUES (?, ?, ?)",
+                             (tool, time.time(), wordlist))
+            self.scan = cur.lastrowid
+            self.targets = {b: target_id(db, b) for b in self.bases}
+            db.executemany("INSERT INTO scan_targets (scan, target) VALUES (?, ?)",
+                           [(self.scan, t) for t in self.targets.values()])
+        db.close()
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def carry(self, bases):
+        # a resumed target only reports what it finds from here on, so
+        # its paths and findings from the interrupted scan are taken over
+        db = connect(self.path)
+        with db:
+            for b in bases:
+                t = self.targets.get(b)
+                prev = t is not None and db.execute(
+                    "SELECT MAX(scan) FROM scan_targets WHERE target = ? AND completed = 0 "
+                    "AND scan < ?", (t, self.scan)).fetchone()[0]
+                if prev:
+                    for table in ("paths", "findings"):
+                        db.execute(f"INSERT OR IGNORE INTO {table} SELECT ?, target, "
+                                   f"{COLUMNS[table]} FROM {table} WHERE scan = ? AND target = ?",
+                                   (self.scan, prev, t))
+        db.close()
+
+    def add_path(self, rec):
+        base, path = split_url(rec["url"], self.bases)
+        self._q.put(("path", base, path, rec["status"], rec.get("length"),
+                     rec.get("location") or "", rec.get("fingerprint")))
+
+    def add_finding(self, base, title, detail, risk):
+        self._q.put(("finding", base, title, detail, risk))
+
+    def set_tech(self, base, tech):
+        if tech:
+            self._q.put(("tech", base, tech))
+
+    def finish(self, completed=()):
+        # completed: the targets whose scan ran to the end, only those
+        # are compared against by later diffs
+        self._q.put(("finish", list(completed)))
+        self._q.put(None)
+        self._thread.join()
+
+    def _run(self):
+        db = connect(self.path)
+        try:
+            done = False
+            while not done:
+                batch = [self._q.get()]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while len(batch) < BATCH and batch[-1] is not None:
+                    try:
+                        batch.append(self._q.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                done = batch[-1] is None
+                with db:
+                    for item in batch:
+                        if item is not None:
+                            self._write(db, item)
+        finally:
+            db.close()
+
+    def _write(self, db, item):
+        kind = item[0]
+        if kind in ("path", "finding"):
+            base = item[1]
+            t = self.targets.get(base)
+            if t is None:
+                t = self.targets[base] = target_id(db, base)
+                db.execute("INSERT OR IGNORE INTO scan_targets (scan, target) VALUES (?, ?)",
+                           (self.scan, t))
+            if kind == "path":
+                db.execute("INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (self.scan, t) + item[2:])
+                if db.execute("INSERT OR IGNORE INTO target_paths VALUES (?, ?)",
+                              (t, item[2])).rowcount:
+                    count_hits(db, [item[2]], [""] + self._tokens(db, t))
+            else:
+                db.execute("INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?)",
+                           (self.scan, t) + item[2:])
+        elif kind == "tech":
+            t = target_id(db, item[1])
+            old = self._tokens(db, t)
+            new = item[2].split()
+            retoken(db, t, [x for x in new if x not in old], 1)
+            retoken(db, t, [x for x in old if x not in new], -1)
+            db.execute("INSERT OR REPLACE INTO target_tech VALUES (?, ?, ?)",
+                       (t, item[2], time.time()))
+            self.techs[t] = new
+        elif kind == "finish":
+            db.execute("UPDATE scans SET finished = ? WHERE id = ?", (time.time(), self.scan))
+            db.executemany("UPDATE scan_targets SET completed = 1 WHERE scan = ? AND target = ?",
+                           [(self.scan, self.targets[b]) for b in item[1] if b in self.targets])
+
+    def _tokens(self, db, t):
+        if t not in self.techs:
+            row = db.execute("SELECT tech FROM target_tech WHERE target = ?", (t,)).fetchone()
+            self.techs[t] = row[0].split() if row else []
+        return self.techs[t]
+
+
+def previous_scan(db, target, before, like=None):
+    # the latest completed scan of target before scan id `before`; with
+    # like, only one made by the same tool with the same wordlist key (the
+    # wordlist plus any option that changes what a scan can find), other
+    # scans found other things for reasons that are not changes
+    q = ("SELECT MAX(st.scan) FROM scan_targets st JOIN scans s ON s.id = st.scan "
+         "WHERE st.target = ? AND st.completed = 1 AND st.scan < ?")
+    args = (target, before)
+    if like is not None:
+        q += " AND s.tool = ? AND s.wordlist IS ?"
+        args += db.execute("SELECT tool, wordlist FROM scans WHERE id = ?", (like,)).fetchone()
+    return db.execute(q, args).fetchone()[0]
+
+
+def changed(old, new):
+    # (status, length, location, fingerprint) of one path in two scans
+    if old[0] != new[0] or (old[2] or "") != (new[2] or ""):
+        return True
+    if old[3] and new[3]:
+        return distance(old[3], new[3]) > MAX_DISTANCE
+    return old[1] != new[1]
+
+
+def diff(db, base, scan=None):
+    # what changed for one target between a scan (default: its latest
+    # completed one) and the last completed scan like it before. None
+    # when there is nothing to compare
+    row = db.execute("SELECT id FROM targets WHERE base = ?", (base,)).fetchone()
+    if row is None:
+        return None
+    t = row[0]
+    if scan is None:
+        scan = previous_scan(db, t, float("inf"))
+    prev = previous_scan(db, t, scan, like=scan) if scan is not None else None
+    if prev is None:
+        return None
+    cols = "c.path, c.status, c.length, c.location, c.fingerprint"
+    only = ("SELECT {cols} FROM paths c LEFT JOIN paths o "
+            "ON o.scan = ? AND o.target = c.target AND o.path = c.path "
+            "WHERE c.scan = ? AND c.target = ? AND o.path IS NULL ORDER BY c.path")
+    both = ("SELECT c.path, o.status, o.length, o.location, o.fingerprint, "
+            "c.status, c.length, c.location, c.fingerprint FROM paths c JOIN paths o "
+            "ON o.scan = ? AND o.target = c.target AND o.path = c.path "
+            "WHERE c.scan = ? AND c.target = ? ORDER BY c.path")
+    fonly = ("SELECT c.title, c.detail, c.risk FROM findings c LEFT JOIN findings o "
+             "ON o.scan = ? AND o.target = c.target AND o.title = c.title AND o.detail = c.detail "
+             "WHERE c.scan = ? AND c.target = ? AND o.title IS NULL ORDER BY c.title")
+    out = {"base": base, "scan": scan, "previous": prev,
+           "when": db.execute("SELECT started FROM scans WHERE id = ?", (scan,)).fetchone()[0],
+           "previous_when": db.execute("SELECT started FROM scans WHERE id = ?",
+                                       (prev,)).fetchone()[0]}
+    out["new"] = db.execute(only.format(cols=cols), (prev, scan, t)).fetchall()
+    out["removed"] = db.execute(only.format(cols=cols), (scan, prev, t)).fetchall()
+    out["changed"] = [(r[0], r[1:5], r[5:9]) for r in db.execute(both, (prev, scan, t))
+                      if changed(r[1:5], r[5:9])]
+    out["findings_new"] = db.execute(fonly, (prev, scan, t)).fetchall()
+    out["findings_removed"] = db.execute(fonly, (scan, prev, t)).fetchall()
+    return out
+
+
+def diff_text(d, limit=50):
+    # the diff as report lines, nothing when nothing changed
+    lines = []
+
+    def section(mark, rows, fmt):
+        for r in rows[:limit]:
+            lines.append(f"  {mark} {fmt(r)}")
+        if len(rows) > limit:
+            lines.append(f"  {mark} ... {len(rows) - limit} more")
+
+    section("+", d["new"], lambda r: f"/{r[0]} {r[1]}")
+    section("-", d["removed"], lambda r: f"/{r[0]} {r[1]}")
+    section("~", d["changed"], lambda r: f"/{r[0]} {r[1][0]} -> {r[2][0]}"
+            + (f" (length {r[1][1]} -> {r[2][1]})" if r[1][1] != r[2][1] else ""))
+    section("+", d["findings_new"], lambda r: f"[{r[0]}] {r[1]}  Risk:{r[2]}")
+    section("-", d["findings_removed"], lambda r: f"[{r[0]}] {r[1]}  Risk:{r[2]}")
+    if not lines:
+        return []
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(d["previous_when"]))
+    head = (f"changes on {d['base']} since {when}: {len(d['new'])} new, "
+            f"{len(d['removed'])} removed, {len(d['changed'])} changed paths, "
+            f"{len(d['findings_new'])} new and {len(d['findings_removed'])} gone findings")
+    return [head] + lines
+
+
+def find_target(db, target):
+    # the recorded base for what the user typed; without a scheme, one
+    # scanned over http matches too
+    from shark_engine import normalize_target
+    base = normalize_target(target)
+    if "://" not in target and db.execute("SELECT 1 FROM targets WHERE base = ?",
+                                          (base,)).fetchone() is None:
+        other = "http" + base[len("https"):]
+        if db.execute("SELECT 1 FROM targets WHERE base = ?", (other,)).fetchone():
+            return other
+    return base
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SharkBuster scan history")
+    ap.add_argument("--db", default=default_path())
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("scans", help="list recorded scans")
+    s.add_argument("target", nargs="?")
+    d = sub.add_parser("diff", help="changes since the previous comparable scan of a target")
+    d.add_argument("target")
+    d.add_argument("--scan", type=int, help="compare this scan with the one before it")
+    d.add_argument("--limit", type=int, default=200)
+    a = ap.parse_args()
+    db = connect(a.db)
+    if a.command == "scans":
+        q = ("SELECT s.id, s.tool, s.started, t.base, st.completed, "
+             "(SELECT COUNT(*) FROM paths p WHERE p.scan = s.id AND p.target = t.id) "
+             "FROM scans s JOIN scan_targets st ON st.scan = s.id JOIN targets t ON t.id = st.target")
+        args = ()
+        if a.target:
+            q += " WHERE t.base = ?"
+            args = (find_target(db, a.target),)
+        for sid, tool, started, base, completed, n in db.execute(q + " ORDER BY s.id", args):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(started))
+            print(f"{sid:6} {when} {tool:7} {base} {n} paths{'' if completed else ' (incomplete)'}")
+    else:
+        r = diff(db, find_target(db, a.target), a.scan)
+        if r is None:
+            print("nothing to compare: no earlier completed scan with the same tool, wordlist and options")
+        else:
+            print("\n".join(diff_text(r, a.limit)) or "no changes")
+
+
+if __name__ == "__main__":
+    main()
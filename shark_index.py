@@ -0,0 +1,103 @@
+import json
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def features(text, stop=()):
+    # words plus the character trigrams of each word, so a misspelled
+    # word still shares most of its features with the right one
+    out = []
+    for w in WORD.findall(text.lower()):
+        if w in stop:
+            continue
+        out.append(w)
+        p = f"#{w}#"
+        out.extend(p[i:i + 3] for i in range(len(p) - 2))
+    return out
+
+
+class Index:
+    # TF-IDF with cosine scoring over a fixed list of texts. The matrix is
+    # kept column-compressed: feature f occurs in docs[indptr[f]:indptr[f + 1]]
+    # with the l2-normalized weights next to them, so a query only reads
+    # the columns of its own features
+    def __init__(self, texts, stop=()):
+        self.stop = frozenset(stop)
+        self.size = len(texts)
+        counts = [Counter(features(t, self.stop)) for t in texts]
+        df = Counter(f for c in counts for f in c)
+        names = sorted(df)
+        self.vocab = {f: i for i, f in enumerate(names)}
+        n = self.size
+        self.idf = np.array([math.log((1 + n) / (1 + df[f])) + 1 for f in names], np.float32)
+        rows, docs, vals = [np.zeros(0, np.intp)], [np.zeros(0, np.int32)], [np.zeros(0, np.float32)]
+        for d, c in enumerate(counts):
+            ids, w = self._weigh(c)
+            rows.append(ids)
+            docs.append(np.full(len(ids), d, np.int32))
+            vals.append(w)
+        rows = np.concatenate(rows)
+        order = np.argsort(rows, kind="stable")
+        self.docs = np.concatenate(docs)[order]
+        self.weights = np.concatenate(vals)[order]
+        self.indptr = np.zeros(len(names) + 1, np.intp)
+        np.cumsum(np.bincount(rows, minlength=len(names)), out=self.indptr[1:])
+
+    def _weigh(self, counts):
+        # sublinear tf times idf, unit length; unknown features are dropped
+        known = [(self.vocab[f], n) for f, n in counts.items() if f in self.vocab]
+        ids = np.array([i for i, _ in known], np.intp)
+        w = (1 + np.log(np.array([n for _, n in known], np.float32))) * self.idf[ids]
+        norm = np.linalg.norm(w)
+        return ids, (w / norm if norm else w)
+
+    def scores(self, text):
+        ids, w = self._weigh(Counter(features(text, self.stop)))
+        out = np.zeros(self.size, np.float32)
+        for i, x in zip(ids.tolist(), w.tolist()):
+            a, b = self.indptr[i], self.indptr[i + 1]
+            out[self.docs[a:b]] += x * self.weights[a:b]
+        return out
+
+    def search(self, text, k=3):
+        # [(doc, cosine), ...] best first, only docs sharing a feature
+        if not self.size:
+            return []
+        s = self.scores(text)
+        k = min(k, self.size)
+        top = np.argpartition(-s, k - 1)[:k]
+        top = top[np.argsort(-s[top], kind="stable")]
+        return [(int(i), float(s[i])) for i in top if s[i] > 0]
+
+    def search_many(self, texts, k=3):
+        return [self.search(t, k) for t in texts]
+
+
+class KnowledgeBase:
+    # question -> answer pairs, looked up by similarity of the question
+    def __init__(self, pairs, stop=()):
+        self.questions = [q for q, _ in pairs]
+        self.answers = [a for _, a in pairs]
+        self.index = Index(self.questions, stop)
+
+    @classmethod
+    def load(cls, path=None, extra=None, stop=()):
+        # a JSON file holding {"question": "answer", ...} or a list of
+        # [question, answer] pairs; `extra` pairs come first
+        pairs = list((extra or {}).items())
+        if path:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            pairs += list(data.items()) if isinstance(data, dict) else [tuple(x) for x in data]
+        return cls(pairs, stop)
+
+    def answer(self, question, min_score=0.5):
+        hits = self.index.search(question, 1)
+        if hits and hits[0][1] >= min_score:
+            return self.answers[hits[0][0]]
+        return None
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+
+THROTTLE_STATUS = (429, 503)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[i]
+
+
+class AdaptiveLimiter:
+    # AIMD in-flight window: every interval it looks at the requests that
+    # finished since the last decision and either grows the window by
+    # `increase` (healthy and saturated) or shrinks it by `decrease`
+    # (throttled, timing out, or latency well above the best seen).
+    # `window` and `reason` always describe the current decision and
+    # `history` keeps the last changes as (time, old, new, reason)
+    def __init__(self, start=50, floor=4, ceiling=200, interval=1.0,
+                 min_samples=20, increase=4, decrease=0.7,
+                 max_throttle_rate=0.02, max_timeout_rate=0.05,
+                 latency_factor=2.5, on_change=None, on_release=None):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = max(floor, min(start, ceiling))
+        self.interval = interval
+        self.min_samples = min_samples
+        self.increase = increase
+        self.decrease = decrease
+        self.max_throttle_rate = max_throttle_rate
+        self.max_timeout_rate = max_timeout_rate
+        self.latency_factor = latency_factor
+        self.on_change = on_change
+        self.on_release = on_release
+        self.reason = "start"
+        self.history = deque(maxlen=100)
+        self.inflight = 0
+        self.best_p95 = None
+        self._waiters = deque()
+        self._reset()
+
+    def _reset(self):
+        self._latencies = []
+        self._throttled = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._peak = self.inflight
+        self._since = time.monotonic()
+
+    def _take(self):
+        self.inflight += 1
+        if self.inflight > self._peak:
+            self._peak = self.inflight
+
+    def _wake(self):
+        # hand free slots to waiters strictly in arrival order, so a
+        # shrinking window can't starve the oldest request
+        while self._waiters and self.inflight < self.window:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self._take()
+                fut.set_result(None)
+
+    async def __aenter__(self):
+        if self.inflight < self.window and not self._waiters:
+            self._take()
+            return self
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # the slot was handed over just as we got cancelled
+                self.inflight -= 1
+                self._wake()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.inflight -= 1
+        self._wake()
+        if self.on_release:
+            self.on_release()
+
+    def record(self, latency, status=None, timeout=False, error=False):
+        self._latencies.append(latency)
+        if timeout:
+            self._timeouts += 1
+        elif error:
+            self._errors += 1
+        elif status in THROTTLE_STATUS:
+            self._throttled += 1
+        if (len(self._latencies) >= self.min_samples
+                and time.monotonic() - self._since >= self.interval):
+            self._adjust()
+
+    def _adjust(self):
+        n = len(self._latencies)
+        lat = sorted(self._latencies)
+        p50 = percentile(lat, 0.5)
+        p95 = percentile(lat, 0.95)
+        throttle_rate = self._throttled / n
+        timeout_rate = self._timeouts / n
+        saturated = self._peak >= self.window
+        if throttle_rate > self.max_throttle_rate:
+            self._set(self.window * self.decrease,
+                      f"throttled {throttle_rate:.0%} (429/503)")
+        elif timeout_rate > self.max_timeout_rate:
+            self._set(self.window * self.decrease,
+                      f"timeouts {timeout_rate:.0%}")
+        elif self.best_p95 and p95 > self.best_p95 * self.latency_factor:
+            self._set(self.window * self.decrease,
+                      f"p95 {p95 * 1000:.0f}ms > {self.latency_factor}x best "
+                      f"{self.best_p95 * 1000:.0f}ms")
+        elif saturated:
+            self._set(self.window + self.increase,
+                      f"healthy p50 {p50 * 1000:.0f}ms p95 {p95 * 1000:.0f}ms")
+        if timeout_rate <= self.max_timeout_rate:
+            # slow drift upwards so a quiet start doesn't pin the reference
+            if self.best_p95 is None or p95 < self.best_p95:
+                self.best_p95 = p95
+            else:
+                self.best_p95 = self.best_p95 * 0.95 + p95 * 0.05
+        self._reset()
+
+    def _set(self, window, reason):
+        new = max(self.floor, min(self.ceiling, int(window)))
+        if new == self.window:
+            return
+        old = self.window
+        self.window = new
+        self.reason = reason
+        self.history.append((time.time(), old, new, reason))
+        if self.on_change:
+            self.on_change(old, new, reason)
+        if new > old:
+            self._wake()
@@ -0,0 +1,287 @@
+import bisect
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+
+import aiohttp
+
+# histogram buckets grow by 20% from 0.5 ms to a few minutes, quantiles
+# come back as the bucket's upper bound
+BOUNDS = tuple(0.0005 * 1.2 ** i for i in range(70))
+STAGES = ("dns", "connect", "first_byte", "body")
+RATE_WINDOW = 5.0
+
+
+class Histogram:
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, v):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        n = 0
+        for i, c in enumerate(self.counts):
+            n += c
+            if n >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "p99_ms": round(self.quantile(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+            "total": self.total,
+            "counts": self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls()
+        h.counts = list(d["counts"])
+        h.count = d["count"]
+        h.total = d["total"]
+        h.max = d["max_ms"] / 1000
+        return h
+
+
+class Metrics:
+    # counters and histograms for the scan loop. observe() is the only
+    # call on the hot path; everything derived (rates, quantiles, ETA)
+    # is computed when a snapshot is taken
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.bytes = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.hits = 0
+        self.retries = 0
+        self.unresolved = 0
+        self.conn_new = 0
+        self.conn_reused = 0
+        self.statuses = Counter()
+        self.exceptions = Counter()
+        self.latency = Histogram()
+        self.stages = {s: Histogram() for s in STAGES}
+        self.trace_stages = False
+        self._marks = deque()
+
+    def observe(self, latency, status=None, nbytes=0, timeout=False, error=False, ctx=None):
+        self.requests += 1
+        self.latency.observe(latency)
+        if timeout:
+            self.timeouts += 1
+        elif error:
+            self.errors += 1
+        else:
+            self.statuses[status] += 1
+            self.bytes += nbytes
+        if ctx and "headers" in ctx:
+            self.stages["body"].observe(time.monotonic() - ctx["headers"])
+
+    def exception(self, e):
+        self.exceptions[type(e).__name__] += 1
+
+    def request_ctx(self):
+        # per-request scratch space for the stage hooks, passed to aiohttp
+        # as trace_request_ctx; None when stage timing is off
+        return {} if self.trace_stages else None
+
+    def trace_config(self, stages=False):
+        self.trace_stages = stages
+        return trace_config(lambda: self)
+
+    def rate(self):
+        now = time.monotonic()
+        self._marks.append((now, self.requests))
+        while len(self._marks) > 2 and now - self._marks[0][0] > RATE_WINDOW:
+            self._marks.popleft()
+        t0, n0 = self._marks[0]
+        if now - t0 < 0.2:
+            return self.requests / max(now - self.started, 1e-9)
+        return (self.requests - n0) / (now - t0)
+
+    def snapshot(self, done=0, total=0, inflight=0, window=0):
+        rate = self.rate()
+        return {
+            "time": round(time.time(), 3),
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "done": done,
+            "total": total,
+            "rate": round(rate, 1),
+            "eta": round((total - done) / rate, 1) if rate > 0 and total > done else 0.0,
+            "inflight": inflight,
+            "window": window,
+            "requests": self.requests,
+            "hits": self.hits,
+            "retries": self.retries,
+            "unresolved": self.unresolved,
+            "bytes": self.bytes,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+            "exceptions": dict(self.exceptions),
+            "connections": {"new": self.conn_new, "reused": self.conn_reused},
+            "latency": self.latency.to_dict(),
+            "stages": {s: h.to_dict() for s, h in self.stages.items() if h.count},
+        }
+
+
+def trace_config(get):
+    # aiohttp hooks reporting to whatever Metrics get() returns right
+    # then, so a long-lived session can serve one scan after another.
+    # Connection reuse is always counted; when the metrics have
+    # trace_stages set, every request also reports dns, connect (TCP and
+    # TLS together, aiohttp has no separate TLS hook), time to first byte
+    # and body time
+    tc = aiohttp.TraceConfig()
+
+    async def reused(session, tctx, params):
+        m = get()
+        if m is not None:
+            m.conn_reused += 1
+
+    async def conn_start(session, tctx, params):
+        tctx.conn = time.monotonic()
+
+    async def conn_end(session, tctx, params):
+        m = get()
+        if m is not None:
+            m.conn_new += 1
+            if m.trace_stages:
+                m.stages["connect"].observe(time.monotonic() - tctx.conn)
+
+    async def dns_start(session, tctx, params):
+        tctx.dns = time.monotonic()
+
+    async def dns_end(session, tctx, params):
+        m = get()
+        if m is not None and m.trace_stages:
+            m.stages["dns"].observe(time.monotonic() - tctx.dns)
+
+    async def sent(session, tctx, params):
+        tctx.sent = time.monotonic()
+
+    async def answered(session, tctx, params):
+        m = get()
+        if m is None or not m.trace_stages:
+            return
+        now = time.monotonic()
+        if hasattr(tctx, "sent"):
+            m.stages["first_byte"].observe(now - tctx.sent)
+        if tctx.trace_request_ctx is not None:
+            tctx.trace_request_ctx["headers"] = now
+
+    tc.on_connection_reuseconn.append(reused)
+    tc.on_connection_create_start.append(conn_start)
+    tc.on_connection_create_end.append(conn_end)
+    tc.on_dns_resolvehost_start.append(dns_start)
+    tc.on_dns_resolvehost_end.append(dns_end)
+    tc.on_request_headers_sent.append(sent)
+    tc.on_request_end.append(answered)
+    return tc
+
+
+SUMMED = ("done", "total", "rate", "inflight", "window", "requests", "hits", "retries",
+          "unresolved", "bytes", "timeouts", "errors")
+
+
+def merge(snaps):
+    # one snapshot for several processes' worth of them
+    snaps = list(snaps)
+    out = dict(snaps[0])
+    for k in SUMMED:
+        out[k] = sum(s[k] for s in snaps)
+    out["elapsed"] = max(s["elapsed"] for s in snaps)
+    out["eta"] = round((out["total"] - out["done"]) / out["rate"], 1) \
+        if out["rate"] > 0 and out["total"] > out["done"] else 0.0
+    for k in ("statuses", "exceptions", "connections", "dns"):
+        c = Counter()
+        for s in snaps:
+            c.update(s.get(k, {}))
+        out[k] = dict(c)
+    lat = Histogram()
+    stages = {}
+    for s in snaps:
+        lat.merge(Histogram.from_dict(s["latency"]))
+        for name, d in s["stages"].items():
+            stages.setdefault(name, Histogram()).merge(Histogram.from_dict(d))
+    out["latency"] = lat.to_dict()
+    out["stages"] = {k: h.to_dict() for k, h in stages.items()}
+    return out
+
+
+def clock(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def progress_text(snap):
+    pct = snap["done"] / snap["total"] * 100 if snap["total"] else 0.0
+    return (f"{snap['done']}/{snap['total']} {pct:4.1f}%  {snap['rate']:.0f} req/s  "
+            f"inflight {snap['inflight']}/{snap['window']}  hits {snap['hits']}  "
+            f"err {snap['errors']}  timeouts {snap['timeouts']}  retries {snap['retries']}  "
+            f"p95 {snap['latency']['p95_ms']:.0f}ms  eta {clock(snap['eta'])}")
+
+
+class ProgressLine:
+    # one status line redrawn in place, at most every `interval` seconds
+    def __init__(self, stream=None, interval=0.5):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.last = 0.0
+        self.shown = False
+
+    def update(self, snap, force=False):
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        self.stream.write("\r" + progress_text(snap) + "\033[K")
+        self.stream.flush()
+        self.shown = True
+
+    def clear(self):
+        if self.shown:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+            self.shown = False
+
+    def finish(self, snap):
+        self.update(snap, force=True)
+        self.stream.write("\n")
+        self.stream.flush()
+        self.shown = False
+
+
+def export(path, snap):
+    # write-then-rename, a reader never sees half a file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snap, f)
+    os.replace(tmp, path)
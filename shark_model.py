@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import shark_wordlist
+
+# a model is a directory:
+#   model.json   header: format, version, config, and name -> file/shape/dtype
+#                for every weight array
+#   vocab.sbw    the sorted vocabulary as a compiled wordlist
+#   <name>.npy   one plain .npy per array
+# Loading maps everything read-only, nothing is parsed or copied up front,
+# and processes loading the same model share its pages
+FORMAT = "sharkbuster-model"
+VERSION = 1
+HEADER = "model.json"
+VOCAB = "vocab.sbw"
+
+
+def save(path, config, vocab, arrays):
+    # the header goes last and by rename, a directory without one is
+    # not a model, so a half-written save is never loaded
+    vocab = sorted(vocab)
+    os.makedirs(path, exist_ok=True)
+    encoded = [w.encode("utf-8") for w in vocab]
+    sig = hashlib.blake2b(b"\0".join(encoded), digest_size=8).digest()
+    shark_wordlist.write(os.path.join(path, VOCAB), encoded, sig)
+    files = {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        fname = name + ".npy"
+        np.save(os.path.join(path, fname), a)
+        files[name] = {"file": fname, "shape": list(a.shape), "dtype": a.dtype.str}
+    head = {"format": FORMAT, "version": VERSION, "config": config,
+            "vocab": {"file": VOCAB, "size": len(vocab)}, "arrays": files}
+    tmp = os.path.join(path, HEADER + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(head, f, indent=1)
+    os.replace(tmp, os.path.join(path, HEADER))
+
+
+def exists(path):
+    return os.path.isfile(os.path.join(path, HEADER))
+
+
+def load(path):
+    # (config, vocab, arrays): vocab is a mapped Wordlist in sorted
+    # order, arrays are read-only memmaps. ValueError for anything that
+    # is not a model of this version
+    try:
+        with open(os.path.join(path, HEADER)) as f:
+            head = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{path}: not a model ({e})")
+    if head.get("format") != FORMAT or head.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported model format {head.get('format')} "
+                         f"v{head.get('version')}")
+    vocab = shark_wordlist.Wordlist(os.path.join(path, head["vocab"]["file"]))
+    arrays = {}
+    for name, spec in head["arrays"].items():
+        a = np.load(os.path.join(path, spec["file"]), mmap_mode="r")
+        if list(a.shape) != spec["shape"] or a.dtype.str != spec["dtype"]:
+            raise ValueError(f"{path}: {name} does not match the header")
+        arrays[name] = a
+    return head["config"], vocab, arrays
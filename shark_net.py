@@ -0,0 +1,114 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from shark_cache import SingleFlight
+
+LIMIT = 1000
+KEEPALIVE = 30.0
+DNS_TTL = 300.0
+NUMERIC = socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+
+
+def _pinned(host, addr, port):
+    family = socket.AF_INET6 if ipaddress.ip_address(addr).version == 6 else socket.AF_INET
+    return {"hostname": host, "host": addr, "port": port, "family": family,
+            "proto": 0, "flags": NUMERIC}
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class PinnedResolver(AbstractResolver):
+    # DNS for every connector in the process: each (host, port, family)
+    # is looked up once per `ttl` seconds and concurrent misses share the
+    # lookup. pin() fixes a host to given addresses, like curl --resolve.
+    # Only the address is replaced, the URL keeps the name, so Host and
+    # SNI are still right
+    def __init__(self, ttl=DNS_TTL, pins=None):
+        self.ttl = ttl
+        self.lookups = 0
+        self.hits = 0
+        self._cache = {}
+        self._pins = {}
+        self._flight = SingleFlight(keep=False)
+        for host, addrs in (pins or {}).items():
+            self.pin(host, addrs)
+
+    def pin(self, host, addrs):
+        self._pins[host.lower()] = [addrs] if isinstance(addrs, str) else list(addrs)
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        pinned = self._pins.get(host.lower())
+        if pinned:
+            self.hits += 1
+            return [_pinned(host, a, port) for a in pinned]
+        key = (host, port, family)
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] > time.monotonic():
+            self.hits += 1
+            return hit[1]
+        return await self._flight.do(key, lambda: self._lookup(key))
+
+    async def _lookup(self, key):
+        host, port, family = key
+        self.lookups += 1
+        res = await aiohttp.ThreadedResolver().resolve(host, port, family)
+        self._cache[key] = (time.monotonic() + self.ttl, res)
+        return res
+
+    async def prefetch(self, urls, family=0):
+        # resolve every target up front and at once, instead of on each
+        # host's first connection; failures are left to the scan to report
+        jobs = []
+        for u in urls:
+            p = urlparse(u)
+            if p.hostname and not _is_ip(p.hostname):
+                port = p.port or (443 if p.scheme == "https" else 80)
+                jobs.append(self.resolve(p.hostname, port, family))
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    def stats(self):
+        return {"lookups": self.lookups, "hits": self.hits}
+
+    async def close(self):
+        pass
+
+
+class ConnectionPolicy:
+    # how the scanners connect. Pool caps (limit across all hosts,
+    # per_host for each; 0 is no cap), how long an idle keep-alive
+    # connection is kept, and DNS: cached for dns_ttl, or with
+    # resolve_once every host keeps its first answer for the whole process
+    def __init__(self, limit=LIMIT, per_host=0, keepalive=KEEPALIVE, dns_ttl=DNS_TTL,
+                 resolve_once=False, pins=None, family=0):
+        self.limit = limit
+        self.per_host = per_host
+        self.keepalive = keepalive
+        self.family = family
+        self.resolver = PinnedResolver(float("inf") if resolve_once else dns_ttl, pins)
+
+    def connector(self, limit=None, per_host=None):
+        # the resolver caches for every connector, so the connector's own
+        # per-instance DNS cache is off
+        return aiohttp.TCPConnector(
+            limit=self.limit if limit is None else limit,
+            limit_per_host=self.per_host if per_host is None else per_host,
+            keepalive_timeout=self.keepalive,
+            use_dns_cache=False,
+            resolver=self.resolver,
+            family=self.family)
+
+
+# what sessions use unless told otherwise; one resolver cache per process
+DEFAULT = ConnectionPolicy()
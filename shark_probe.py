@@ -0,0 +1,102 @@
+import random
+import string
+
+MAX_BODY = 64 * 1024
+HEAD_REJECTED = (405, 501)
+
+
+class ProbeResult:
+    __slots__ = ("url", "status", "headers", "length", "body", "truncated", "method", "fp")
+
+    def __init__(self, url, status, headers, length, body, truncated, method):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.length = length
+        self.body = body
+        self.truncated = truncated
+        self.method = method
+        # shark_fingerprint.fingerprint() of it, once asked for
+        self.fp = None
+
+
+async def read_capped(r, max_bytes):
+    chunks = []
+    n = 0
+    while n < max_bytes:
+        chunk = await r.content.read(max_bytes - n)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n += len(chunk)
+    truncated = n >= max_bytes and bool(await r.content.read(1))
+    return b"".join(chunks), truncated
+
+
+def content_length(headers):
+    try:
+        return int(headers.get("Content-Length", ""))
+    except ValueError:
+        return None
+
+
+class Probe:
+    # mode "head": always HEAD first, "get": never, "auto": HEAD only
+    # after calibrate() saw the target answer HEAD the same way as GET.
+    # HEAD drops back to GET per request on 405/501 or a missing
+    # Content-Length, and for good after max_head_failures of those
+    def __init__(self, mode="auto", max_bytes=MAX_BODY, max_head_failures=20):
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_head_failures = max_head_failures
+        self.head_failures = 0
+        self.use_head = mode == "head"
+
+    async def calibrate(self, session, base, **kw):
+        if self.mode != "auto":
+            return self.use_head
+        missing = "".join(random.choices(string.ascii_lowercase, k=16))
+        self.use_head = True
+        for url in (base, base.rstrip("/") + "/" + missing):
+            try:
+                async with session.head(url, allow_redirects=False, **kw) as h:
+                    head_status = h.status
+                    head_len = content_length(h.headers)
+                async with session.get(url, allow_redirects=False, **kw) as g:
+                    get_status = g.status
+                    get_len = content_length(g.headers)
+                    if get_len is None:
+                        body, truncated = await read_capped(g, self.max_bytes)
+                        get_len = None if truncated else len(body)
+            except Exception:
+                self.use_head = False
+                break
+            if (head_status in HEAD_REJECTED or head_status != get_status
+                    or head_len is None or head_len != get_len):
+                self.use_head = False
+                break
+        return self.use_head
+
+    async def fetch(self, session, url, get=False, **kw):
+        if self.use_head and not get:
+            async with session.head(url, allow_redirects=False, **kw) as r:
+                length = content_length(r.headers)
+                if r.status not in HEAD_REJECTED and length is not None:
+                    return ProbeResult(url, r.status, r.headers, length,
+                                       b"", False, "HEAD")
+            self.head_failures += 1
+            if self.head_failures >= self.max_head_failures:
+                self.use_head = False
+        async with session.get(url, allow_redirects=False, **kw) as r:
+            length = content_length(r.headers)
+            if length is not None and length > self.max_bytes:
+                # the header already answers the length question, take a
+                # fingerprint-sized prefix and let the rest go
+                body, _ = await read_capped(r, self.max_bytes)
+                return ProbeResult(url, r.status, r.headers, length,
+                                   body, False, "GET")
+            body, truncated = await read_capped(r, self.max_bytes)
+            if length is None:
+                length = len(body)
+            return ProbeResult(url, r.status, r.headers, length,
+                               body, truncated, "GET")
@@ -0,0 +1,162 @@
+import bisect
+import hashlib
+import json
+import os
+
+import shark_history
+from shark_expand import Expansion
+
+# a path nobody has seen hit yet is assumed to hit this often; with the
+# weights below it decides how fast a few past hits outweigh the prior
+PRIOR = 0.001
+GLOBAL_WEIGHT = 2.0
+TECH_WEIGHT = 5.0
+
+
+class HitStats:
+    # which paths were hits in past scans, from the history database:
+    # per path, on how many distinct targets it was found, overall and
+    # per tech token ("server:nginx", "waf:cloudflare"), against how many
+    # targets were scanned overall and with each token
+    def __init__(self):
+        self.targets = 0
+        self.hits = {}
+        self.tech_targets = {}
+        self.tech_hits = {}
+        self.tech_of = {}
+        # (words, candidates(words)) for the last wordlist ordered
+        self._located = None
+
+    @classmethod
+    def load(cls, path=None):
+        # reads the aggregates HistoryWriter keeps, not the paths table
+        path = path or shark_history.default_path()
+        st = cls()
+        if not os.path.exists(path):
+            return st
+        db = shark_history.connect(path)
+        try:
+            st.targets = db.execute("SELECT COUNT(*) FROM targets").fetchone()[0]
+            for base, tech in db.execute("SELECT base, tech FROM target_tech "
+                                         "JOIN targets ON targets.id = target"):
+                st.tech_of[base] = tech
+                for tok in tech.split():
+                    st.tech_targets[tok] = st.tech_targets.get(tok, 0) + 1
+            for p, tok, n in db.execute("SELECT path, token, targets FROM path_hits"):
+                if tok:
+                    st.tech_hits.setdefault(tok, {})[p] = n
+                else:
+                    st.hits[p] = n
+        finally:
+            db.close()
+        return st
+
+    def rate(self, path, tech=()):
+        # estimated chance that path is a hit on a target running `tech`:
+        # the smoothed overall rate, moved toward what targets with each
+        # known token showed, averaged over the tokens
+        g = (self.hits.get(path, 0) + GLOBAL_WEIGHT * PRIOR) / (self.targets + GLOBAL_WEIGHT)
+        rates = []
+        for tok in tech:
+            n = self.tech_targets.get(tok)
+            if n:
+                h = self.tech_hits.get(tok, {}).get(path, 0)
+                rates.append((h + TECH_WEIGHT * g) / (n + TECH_WEIGHT))
+        return sum(rates) / len(rates) if rates else g
+
+    def order(self, base, words):
+        # Options.order: past hits first, by what base was last seen running
+        if not self.hits:
+            return None
+        if self._located is None or self._located[0] is not words:
+            self._located = (words, candidates(words, self))
+        return head(self._located[1], self, self.tech_of.get(base, ""))
+
+
+def locate(words, paths):
+    # index of the first occurrence of each of paths in words, one pass
+    want = set(paths)
+    found = {}
+    for i, w in enumerate(words):
+        if w in want and w not in found:
+            found[w] = i
+            if len(found) == len(want):
+                break
+    return found
+
+
+def candidates(words, stats):
+    # {index: past hit paths} for the words seen hit before. For an
+    # Expansion these index its base words, with every hit path the word
+    # could be a variant of. The same for every target, one wordlist pass
+    paths = {}
+    for p in stats.hits:
+        for root in (words.roots(p) if isinstance(words, Expansion) else (p,)):
+            paths.setdefault(root, []).append(p)
+    found = locate(words.base if isinstance(words, Expansion) else words, paths)
+    return {i: paths[w] for w, i in found.items()}
+
+
+def head(cands, stats, tech=""):
+    # the candidates() indices likeliest first on a target running tech,
+    # in file order among equals; a word is as likely as its likeliest
+    # variant
+    tech = tech.split()
+    best = {i: max(stats.rate(p, tech) for p in paths) for i, paths in cands.items()}
+    return sorted(best, key=lambda i: (-best[i], i))
+
+
+def reorder(words, head):
+    # words with head moved to the front, see head()
+    if not head:
+        return words
+    if isinstance(words, Expansion):
+        return words.rebase(Ranked(words.base, head))
+    return Ranked(words, head)
+
+
+class Ranked:
+    # words with the items at `head` (indices into words) first, in that
+    # order, and everything else after them in its old order. Nothing is
+    # copied: item j past the head is the j-th index not in head, found
+    # by bisecting over the sorted head
+    def __init__(self, words, head, start=0, stop=None, _gaps=None):
+        self.words = words
+        self.head = list(head)
+        if _gaps is None:
+            # gaps[k]: how many non-head indices come before the k-th
+            # smallest head index
+            _gaps = [x - k for k, x in enumerate(sorted(self.head))]
+        self._gaps = _gaps
+        self.start, self.stop, _ = slice(start, stop).indices(len(words))
+        sig = getattr(words, "signature", None)
+        self.signature = None
+        if sig is not None:
+            self.signature = hashlib.blake2b(sig + json.dumps(self.head).encode(),
+                                             digest_size=8).digest()
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def index(self, n):
+        # where item n of the whole ranked order is in words
+        if n < len(self.head):
+            return self.head[n]
+        j = n - len(self.head)
+        return j + bisect.bisect_right(self._gaps, j)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("ranked slices must be contiguous")
+            return Ranked(self.words, self.head, self.start + start, self.start + stop, self._gaps)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.words[self.index(self.start + i)]
+
+    def __iter__(self):
+        for n in range(self.start, self.stop):
+            yield self.words[self.index(n)]
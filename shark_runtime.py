@@ -0,0 +1,78 @@
+import asyncio
+import atexit
+import os
+
+import aiohttp
+
+import shark_metrics
+import shark_net
+
+# one event loop and one HTTP session per process. The tools run their
+# coroutines through run() instead of asyncio.run(), so when the launcher
+# runs them one after another in-process the loop, the connection pool,
+# the TLS cache and the other loop-bound state all stay warm
+_loop = None
+_owner = None
+_session = None
+_metrics = None
+
+
+def loop():
+    global _loop, _owner
+    if _loop is None or _loop.is_closed():
+        _owner = os.getpid()
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def run(coro):
+    # like asyncio.run(), but the loop outlives the call. On Ctrl+C (or
+    # anything else) the task is cancelled and allowed to unwind before
+    # the exception goes on, so nothing of it is left on the loop for the
+    # next run to resume
+    lp = loop()
+    task = lp.create_task(coro)
+    try:
+        return lp.run_until_complete(task)
+    except BaseException:
+        task.cancel()
+        try:
+            lp.run_until_complete(task)
+        except BaseException:
+            pass
+        raise
+
+
+async def session(metrics=None):
+    # the shared session; connection stats and stage timings go to
+    # `metrics` until the next caller passes its own. Pool and DNS follow
+    # shark_net.DEFAULT; per-host limits are the engine's limiter's job
+    global _session, _metrics
+    if metrics is not None:
+        _metrics = metrics
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=shark_net.DEFAULT.connector(),
+            trace_configs=[shark_metrics.trace_config(lambda: _metrics)])
+    return _session
+
+
+@atexit.register
+def close():
+    # only in the process that made the loop: a forked child must not
+    # shut down TLS connections the parent still uses
+    global _session
+    if _loop is None or _loop.is_closed() or os.getpid() != _owner:
+        return
+    if _session is not None and not _session.closed:
+        _loop.run_until_complete(_session.close())
+    _session = None
+    left = asyncio.all_tasks(_loop)
+    for t in left:
+        t.cancel()
+    if left:
+        # gather() of nothing wants a current loop, which an asyncio.run()
+        # since (run_parallel's) has cleared
+        _loop.run_until_complete(asyncio.gather(*left, return_exceptions=True))
+    _loop.close()
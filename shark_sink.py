@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import asyncio
+
+GREEN  = "\033[92m"
+YELLOW = "\033[93m"
+RED    = "\033[91m"
+CYAN   = "\033[96m"
+WHITE  = "\033[97m"
+RESET  = "\033[0m"
+
+
+def status_color(code):
+    if code == 200:
+        return GREEN
+    elif code in (301, 302, 307):
+        return YELLOW
+    elif code in (429, 500):
+        return RED
+    elif code in (401, 403):
+        return CYAN
+    else:
+        return WHITE
+
+
+def make_record(url, status, length, location="", latency=0.0,
+                truncated=False, fingerprint=None):
+    return {
+        "url": url,
+        "status": status,
+        "length": length,
+        "truncated": truncated,
+        "location": location,
+        "fingerprint": fingerprint,
+        "latency": round(latency, 4),
+        "timestamp": round(time.time(), 3),
+    }
+
+
+def render(rec, color=True):
+    line = f"{rec['url']} {rec['status']}"
+    if rec.get("location"):
+        line += f" -> {rec['location']}"
+    if not color:
+        return line
+    return f"{status_color(rec['status'])}{line}{RESET}"
+
+
+class ResultSink:
+    # JSON Lines writer, records reach the OS once max_pending are
+    # buffered or flush_interval seconds have passed, so a killed process
+    # loses at most that window. The file starts over unless append is
+    # set, for a resumed scan going on with its results
+    def __init__(self, path, max_pending=256, flush_interval=0.5,
+                 buffer_size=64 * 1024, fsync=False, append=False):
+        self.path = path
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.count = 0
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self._f = open(path, "a" if append else "w", buffering=buffer_size, encoding="utf-8")
+        self._task = None
+
+    def write(self, rec):
+        self._f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        self.count += 1
+        self.pending += 1
+        if (self.pending >= self.max_pending
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._f.closed:
+            return
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def tell(self):
+        # size of the file with everything written so far on disk
+        self.flush()
+        return os.fstat(self._f.fileno()).st_size
+
+    def truncate(self, size):
+        # drop records written after a checkpoint that is being resumed;
+        # False when the file is already shorter than that
+        if size > self.tell():
+            return False
+        self._f.truncate(size)
+        return True
+
+    async def _autoflush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.pending:
+                self.flush()
+
+    def start(self):
+        # timer flush for quiet stretches where no new hit triggers one
+        if self._task is None:
+            self._task = asyncio.create_task(self._autoflush())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if not self._f.closed:
+            self.flush()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,143 @@
+import asyncio
+import ssl
+import time
+
+import shark_net
+from shark_cache import SingleFlight
+
+VERSIONS = (
+    ("TLSv1", ssl.TLSVersion.TLSv1),
+    ("TLSv1.1", ssl.TLSVersion.TLSv1_1),
+    ("TLSv1.2", ssl.TLSVersion.TLSv1_2),
+    ("TLSv1.3", ssl.TLSVersion.TLSv1_3),
+)
+WEAK_VERSIONS = ("TLSv1", "TLSv1.1")
+CONCURRENCY = 20
+TIMEOUT = 4.0
+TTL = 3600.0
+EXPIRY_WARN_DAYS = 30
+
+
+def _name(rdns):
+    # (( ("commonName", "x"), ), ...) -> "CN=x, O=y"
+    short = {"commonName": "CN", "organizationName": "O", "countryName": "C",
+             "organizationalUnitName": "OU"}
+    return ", ".join(f"{short.get(k, k)}={v}" for rdn in rdns for k, v in rdn)
+
+
+def _pinned(version):
+    # unverified context that only speaks one protocol version; old
+    # versions need security level 0 to be offered at all
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    ctx.minimum_version = version
+    ctx.maximum_version = version
+    if version < ssl.TLSVersion.TLSv1_2:
+        ctx.set_ciphers("ALL:@SECLEVEL=0")
+    return ctx
+
+
+class TLSInspector:
+    # asyncio TLS checks for many hosts at once. One inspect() per
+    # (host, port) does a verified handshake for the certificate and one
+    # pinned handshake per protocol version, all concurrently; the result
+    # is kept for `ttl` seconds so repeated scans don't handshake again.
+    # Names go through the scanners' resolver, so --resolve pins hold here
+    def __init__(self, concurrency=CONCURRENCY, timeout=TIMEOUT, ttl=TTL, resolver=None):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.resolver = resolver or shark_net.DEFAULT.resolver
+        self.handshakes = 0
+        self._gate = asyncio.Semaphore(concurrency)
+        self._flight = SingleFlight()
+        self._expires = {}
+
+    async def inspect(self, host, port=443):
+        key = (host, port)
+        if self._expires.get(key, float("inf")) < time.monotonic():
+            del self._expires[key]
+            self._flight.forget(key)
+        return await self._flight.do(key, lambda: self._inspect(host, port))
+
+    async def _connect(self, host, port, ctx):
+        # to the address the resolver gives, pinned or not, with the
+        # name kept for SNI
+        addr = (await self.resolver.resolve(host, port, 0))[0]["host"]
+        return await asyncio.open_connection(addr, port, ssl=ctx, server_hostname=host,
+                                             ssl_handshake_timeout=self.timeout)
+
+    async def _handshake(self, host, port, ctx):
+        async with self._gate:
+            self.handshakes += 1
+            _, w = await asyncio.wait_for(self._connect(host, port, ctx), self.timeout)
+            try:
+                return w.get_extra_info("ssl_object")
+            finally:
+                w.close()
+
+    async def _version(self, host, port, name, version):
+        try:
+            await self._handshake(host, port, _pinned(version))
+            return name
+        except (OSError, ssl.SSLError, ValueError, asyncio.TimeoutError):
+            return None
+
+    async def _inspect(self, host, port):
+        info = {"host": host, "port": port, "version": None, "versions": [],
+                "subject": "", "issuer": "", "san": [], "not_after": None,
+                "days_left": None, "chain": [], "error": None}
+        cert_job = self._handshake(host, port, ssl.create_default_context())
+        got = await asyncio.gather(cert_job,
+                                   *(self._version(host, port, n, v) for n, v in VERSIONS),
+                                   return_exceptions=True)
+        self._expires[(host, port)] = time.monotonic() + self.ttl
+        sslobj, versions = got[0], got[1:]
+        info["versions"] = [v for v in versions if isinstance(v, str)]
+        if isinstance(sslobj, BaseException):
+            if isinstance(sslobj, ssl.SSLCertVerificationError):
+                info["error"] = sslobj.verify_message or str(sslobj)
+            elif isinstance(sslobj, asyncio.TimeoutError):
+                info["error"] = "timeout"
+            else:
+                info["error"] = str(sslobj) or type(sslobj).__name__
+            return info
+        cert = sslobj.getpeercert() or {}
+        info["version"] = sslobj.version()
+        info["subject"] = _name(cert.get("subject", ()))
+        info["issuer"] = _name(cert.get("issuer", ()))
+        info["san"] = [v for k, v in cert.get("subjectAltName", ()) if k == "DNS"]
+        if cert.get("notAfter"):
+            info["not_after"] = ssl.cert_time_to_seconds(cert["notAfter"])
+            info["days_left"] = int((info["not_after"] - time.time()) // 86400)
+        get_chain = getattr(sslobj, "get_verified_chain", None)  # 3.13+
+        if get_chain is not None:
+            info["chain"] = [_name(c.get_info().get("subject", ())) for c in get_chain()]
+        else:
+            info["chain"] = [info["subject"], info["issuer"]]
+        return info
+
+
+def findings(info):
+    # (title, detail, risk) rows in the shape Shark3 reports use
+    out = []
+    if not info["versions"] and info["error"]:
+        return out
+    weak = [v for v in info["versions"] if v in WEAK_VERSIONS]
+    if weak:
+        out.append(("Weak TLS Version", ", ".join(weak), "High"))
+    if info["versions"]:
+        out.append(("TLS Versions", ", ".join(info["versions"]), "Low"))
+    if info["error"]:
+        out.append(("Invalid Certificate", info["error"], "High"))
+        return out
+    days = info["days_left"]
+    if days is not None and days < 0:
+        out.append(("Expired Certificate", f"{-days} days ago", "High"))
+    elif days is not None and days < EXPIRY_WARN_DAYS:
+        out.append(("Certificate Expiring", f"in {days} days", "Medium"))
+    if info["subject"]:
+        out.append(("Certificate", f"{info['subject']} issued by {info['issuer']}", "Low"))
+    if info["san"]:
+        out.append(("Certificate SAN", ", ".join(info["san"][:20]), "Low"))
+    return out
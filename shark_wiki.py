@@ -0,0 +1,70 @@
+import asyncio
+import re
+from urllib.parse import quote
+
+import aiohttp
+
+import shark_dirs
+import shark_runtime
+from shark_cache import DiskCache, SingleFlight
+
+BASE_URL = "https://{lang}.wikipedia.org/api/rest_v1/page/summary/"
+TIMEOUT = 5.0
+NO_RESULT = "no result"
+FAILED = "search failed"
+
+
+def query_key(q, stop=()):
+    # "What is the Milk?" -> "milk"; None when only stop words are left
+    words = [w for w in re.sub(r"[?!.,]", " ", q.lower()).split() if w not in stop]
+    return "_".join(words) or None
+
+
+class WikiClient:
+    # page summaries from the Wikipedia REST API (or anything serving the
+    # same /page/summary/<title> JSON at base_url). Answers, misses
+    # included, go to a disk cache keyed on the normalized query; identical
+    # questions in flight share one request. offline=True never touches the
+    # network and answers from the cache, expired entries included
+    def __init__(self, base_url=BASE_URL, lang="en", stop=(), timeout=TIMEOUT,
+                 cache=None, offline=False):
+        self.base_url = base_url
+        self.lang = lang
+        self.stop = frozenset(stop)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache = cache if cache is not None else DiskCache(shark_dirs.cache_dir("wiki.json"))
+        self.offline = offline
+        self.requests = 0
+        self._flight = SingleFlight(keep=False)
+
+    def url(self, key):
+        return self.base_url.format(lang=self.lang) + quote(key)
+
+    async def summary(self, q):
+        key = query_key(q, self.stop)
+        if key is None:
+            return NO_RESULT
+        ckey = f"{self.lang}:{key}"
+        hit = self.cache.get(ckey, stale=self.offline)
+        if hit is not None:
+            return hit
+        if self.offline:
+            return NO_RESULT
+        return await self._flight.do(ckey, lambda: self._fetch(ckey, key))
+
+    async def _fetch(self, ckey, key):
+        session = await shark_runtime.session()
+        self.requests += 1
+        try:
+            async with session.get(self.url(key), timeout=self.timeout,
+                                   headers={"Accept": "application/json"}) as r:
+                if r.status == 404:
+                    text = NO_RESULT
+                elif r.status != 200:
+                    return FAILED
+                else:
+                    text = (await r.json(content_type=None)).get("extract") or NO_RESULT
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, AttributeError):
+            return FAILED
+        self.cache.put(ckey, text)
+        return text
@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import shark_dirs
+
+# compiled wordlist layout, all integers little-endian:
+#   header   MAGIC, version u16, reserved u16, count u64, signature 8 bytes
+#   offsets  (count + 1) x u64, entry i is data[offsets[i]:offsets[i + 1]]
+#   data     the normalized utf-8 entries back to back
+MAGIC = b"SBWL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ8s")
+
+# wordlists this process has mapped already, by signature; a long-lived
+# process (the launcher menu) reuses them instead of mapping again
+_mapped = {}
+
+
+def normalize(line, ignored=()):
+    # the same cleanup Shark3 and Shark4 used to do per line at scan time:
+    # whitespace, leading slashes, and the static-file extension filter
+    p = line.strip().lstrip("/")
+    if not p or p.startswith("#"):
+        return None
+    if ignored and p.lower().endswith(ignored):
+        return None
+    return p
+
+
+def signature(paths, ignored=()):
+    h = hashlib.blake2b(digest_size=8)
+    h.update(struct.pack("<H", VERSION))
+    for path in paths:
+        st = os.stat(path)
+        h.update(os.path.abspath(path).encode("utf-8", "surrogateescape"))
+        h.update(struct.pack("<qq", st.st_size, st.st_mtime_ns))
+    h.update("\0".join(ignored).encode())
+    return h.digest()
+
+
+def compile_wordlists(paths, out, ignored=()):
+    # merge text wordlists into one de-duplicated compiled file, first
+    # occurrence wins so the order of the inputs is kept
+    ignored = tuple(ignored)
+    seen = set()
+    entries = []
+    for path in paths:
+        with open(path, errors="ignore") as f:
+            for line in f:
+                p = normalize(line, ignored)
+                if p is None:
+                    continue
+                b = p.encode("utf-8")
+                if b in seen:
+                    continue
+                seen.add(b)
+                entries.append(b)
+    return write(out, entries, signature(paths, ignored))
+
+
+def write(out, entries, sig):
+    # entries (utf-8 bytes) as they are, in the compiled layout
+    offsets = array("Q", [0])
+    data = bytearray()
+    for b in entries:
+        data += b
+        offsets.append(len(data))
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets) - 1, sig))
+        offsets.tofile(f)
+        f.write(data)
+    os.replace(tmp, out)
+    return out
+
+
+def is_compiled(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+class Wordlist:
+    # read-only view over a memory-mapped compiled wordlist. Entry N is
+    # two offset reads and one slice; slicing gives another view on the
+    # same mapping, which is what sharding and resume use
+    def __init__(self, path, start=0, stop=None, _mm=None):
+        self.path = path
+        if _mm is None:
+            with open(path, "rb") as f:
+                _mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mm = _mm
+        magic, version, _, count, sig = HEADER.unpack_from(_mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a compiled wordlist")
+        self.signature = sig
+        self.total = count
+        end = HEADER.size + 8 * (count + 1)
+        if sys.byteorder == "little":
+            self._offsets = memoryview(_mm)[HEADER.size:end].cast("Q")
+        else:
+            self._offsets = array("Q", _mm[HEADER.size:end])
+            self._offsets.byteswap()
+        self._data = end
+        self.start, self.stop, _ = slice(start, stop).indices(count)
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def raw(self, i):
+        n = self.start + i
+        return self._mm[self._data + self._offsets[n]:self._data + self._offsets[n + 1]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("wordlist slices must be contiguous")
+            return Wordlist(self.path, self.start + start, self.start + stop, self._mm)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.raw(i).decode("utf-8")
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, i):
+        mm, offs, data = self._mm, self._offsets, self._data
+        for n in range(self.start + i, self.stop):
+            yield mm[data + offs[n]:data + offs[n + 1]].decode("utf-8")
+
+
+def load(paths, ignored=()):
+    # a compiled file is mapped as is; text wordlists are compiled once
+    # into the cache and recompiled when a source or the filter changes
+    if isinstance(paths, str):
+        paths = [paths]
+    ignored = tuple(ignored)
+    if len(paths) == 1 and is_compiled(paths[0]):
+        return Wordlist(paths[0])
+    sig = signature(paths, ignored)
+    wl = _mapped.get(sig)
+    if wl is not None:
+        return wl
+    out = shark_dirs.cache_dir("wordlists", sig.hex() + ".sbw")
+    wl = None
+    if os.path.isfile(out):
+        try:
+            wl = Wordlist(out)
+            if wl.signature != sig:
+                wl = None
+        except ValueError:
+            pass
+    if wl is None:
+        wl = Wordlist(compile_wordlists(paths, out, ignored))
+    _mapped[sig] = wl
+    return wl
+
+
+def main():
+    ap = argparse.ArgumentParser(description="compile text wordlists into a de-duplicated SharkBuster wordlist")
+    ap.add_argument("out", help="compiled output file")
+    ap.add_argument("inputs", nargs="+", help="text wordlists, merged in order")
+    ap.add_argument("--ignore", default="", help="comma separated extensions to drop, e.g. .jpg,.png")
+    a = ap.parse_args()
+    ignored = tuple(x.strip() for x in a.ignore.split(",") if x.strip())
+    wl = Wordlist(compile_wordlists(a.inputs, a.out, ignored))
+    print(f"{a.out}: {len(wl)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shark_engine
+import shark_wordlist
+
+PAGES = {
+    "admin": "admin panel, sign in to manage the site",
+    "login": "login form with user name and password fields",
+    "config.php": "configuration page for the database",
+    "dir/": "index of dir with a few files in it",
+    "dir/inner": "a page inside the directory",
+}
+
+
+class Server:
+    # aiohttp on its own thread and loop, so the engine under test (and
+    # processes it forks) talk to it over real sockets. requests holds
+    # every (method, path) it answered, pages can be changed between scans
+    def __init__(self):
+        self.pages = dict(PAGES)
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self.thread.start()
+        started.wait(5)
+        self.url = f"http://127.0.0.1:{self.port}/"
+
+    async def handle(self, request):
+        path = request.path.lstrip("/")
+        self.requests.append((request.method, path))
+        body = self.pages.get(path)
+        if body is None:
+            return web.Response(status=404, text="not found")
+        return web.Response(text=body)
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+        self.loop.run_until_complete(web.SockSite(self.runner, sock).start())
+        started.set()
+        self.loop.run_forever()
+
+    def paths(self, among):
+        # the distinct paths of `among` that were requested
+        return {p for _, p in self.requests if p in among}
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+@pytest.fixture
+def server():
+    s = Server()
+    yield s
+    s.stop()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    # caches, checkpoints and history under tmp_path, files written to
+    # the working directory land there too
+    for var in ("XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_CONFIG_HOME"):
+        monkeypatch.setenv(var, str(tmp_path / var.lower()))
+    monkeypatch.chdir(tmp_path)
+    shark_engine.CALIBRATIONS.clear()
+    return tmp_path
+
+
+@pytest.fixture
+def wordlist(tmp_path):
+    # wordlist(words) -> a compiled Wordlist of them, from a file
+    def make(words, name="words.txt"):
+        path = tmp_path / name
+        path.write_text("".join(w + "\n" for w in words))
+        return shark_wordlist.load(str(path))
+    return make
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+
+import shark_engine
+
+WORDS = ["admin", "nothing", "login", "missing", "config.php", "old", "dir/", "inner"]
+FOUND = {"admin", "login", "config.php", "dir/"}
+
+
+def found(server, recs):
+    return {r["url"][len(server.url):] for r in recs}
+
+
+def test_scan_finds_hits_without_touching_disk(server, wordlist, isolated):
+    words = wordlist(WORDS)
+    before = set(os.listdir(isolated))
+    recs = asyncio.run(shark_engine.scan([server.url], words))
+    assert found(server, recs) == FOUND
+    assert set(os.listdir(isolated)) == before
+    assert not os.path.exists(isolated / "xdg_cache_home" / "sharkbuster" / "checkpoints")
+
+
+def test_stream_yields_what_scan_returns(server, wordlist):
+    words = wordlist(WORDS)
+
+    async def collect():
+        engine = shark_engine.Engine([server.url], words, shark_engine.Options())
+        try:
+            return [rec async for rec in engine.stream()]
+        finally:
+            engine.close()
+    assert found(server, asyncio.run(collect())) == FOUND
+
+
+def test_recursion_scans_found_directories(server, wordlist):
+    recs = asyncio.run(shark_engine.scan([server.url], wordlist(WORDS), max_depth=1))
+    assert found(server, recs) == FOUND | {"dir/inner"}
+
+
+def test_read_targets(tmp_path):
+    f = tmp_path / "targets.txt"
+    f.write_text("# batch\nlocalhost:8080\nhttp://a.example\nhttp://a.example/\nhttps://\n")
+    errors = []
+    got = shark_engine.read_targets(str(f), lambda kind, msg: errors.append(kind))
+    assert got == ["https://localhost:8080/", "http://a.example/"]
+    assert errors.count("error") == 1
+    assert shark_engine.read_targets("example.com") == ["https://example.com/"]
+
+
+def run(words, **options):
+    engine = shark_engine.Engine([options.pop("target")], words, shark_engine.Options(**options))
+    try:
+        asyncio.run(engine.run())
+    finally:
+        engine.close()
+    return engine
+
+
+def test_budget_then_resume_sends_every_path_once(server, wordlist):
+    words = [f"w{i}" for i in range(60)] + ["admin", "login"]
+    wl = wordlist(words)
+    opts = dict(target=server.url, checkpoint=True, results_file="r.jsonl", retries=0)
+    engine = run(wl, budget_paths=25, **opts)
+    assert engine.scans[0].stopped and not engine.scans[0].finished
+    first = server.paths(words)
+    assert first == set(words[:25])
+
+    server.requests.clear()
+    engine = run(wl, **opts)
+    assert engine.scans[0].finished
+    assert server.paths(words) == set(words[25:])
+    with open("r.jsonl") as f:
+        urls = [json.loads(line)["url"] for line in f]
+    assert sorted(urls) == [server.url + "admin", server.url + "login"]
+    assert not os.listdir(os.path.join(os.environ["XDG_CACHE_HOME"], "sharkbuster", "checkpoints"))
+
+
+def test_ranked_budget_over_processes_sends_the_head(server, wordlist):
+    words = [f"w{i}" for i in range(300)]
+    engine = shark_engine.Engine([server.url], wordlist(words), shark_engine.Options(
+        processes=3, budget_paths=31, retries=0,
+        order=lambda base, words: [299, 150]))
+    total = engine.run_parallel()
+    assert total["stopped"] == [server.url]
+    assert server.paths(words) == {"w299", "w150"} | {f"w{i}" for i in range(29)}
+
+
+def test_shards_merge_into_one_ordered_file(server, wordlist):
+    words = [f"w{i}" for i in range(40)] + WORDS
+    engine = shark_engine.Engine([server.url], wordlist(words), shark_engine.Options(
+        processes=2, results_file="r.jsonl"))
+    total = engine.run_parallel()
+    assert total["finished"] == [server.url]
+    with open("r.jsonl") as f:
+        recs = [json.loads(line) for line in f]
+    assert found(server, recs) == FOUND
+    assert [r["index"] for r in recs] == sorted(r["index"] for r in recs)
+    assert not [x for x in os.listdir(".") if x.startswith("r.jsonl.shard")]
@@ -0,0 +1,44 @@
+import shark_history
+
+import Shark4
+
+
+def scan(server, tmp_path, depth):
+    path = tmp_path / "words.txt"
+    path.write_text("admin\nlogin\ndir/\ninner\nnothing\n")
+    Shark4.run_scan([server.url], [str(path)], depth, resume=False, progress=False)
+
+
+def latest_diff(server):
+    db = shark_history.connect(shark_history.default_path())
+    try:
+        return shark_history.diff(db, server.url)
+    finally:
+        db.close()
+
+
+def test_diff_only_against_the_same_scope(server, tmp_path):
+    scan(server, tmp_path, 1)
+    # a shallower scan finds less for reasons that are not changes
+    scan(server, tmp_path, 0)
+    assert latest_diff(server) is None
+
+    server.pages.pop("login")
+    server.pages["admin"] = "maintenance mode, come back tomorrow for something else entirely"
+    scan(server, tmp_path, 0)
+    d = latest_diff(server)
+    assert [r[0] for r in d["removed"]] == ["login"]
+    assert [r[0] for r in d["changed"]] == ["admin"]
+    assert d["new"] == []
+
+
+def test_writer_records_paths_per_scan(server, tmp_path):
+    path = str(tmp_path / "h.db")
+    for status in (200, 403):
+        h = shark_history.HistoryWriter("web", [server.url], "words", path)
+        h.add_path({"url": server.url + "admin", "status": status, "length": 10})
+        h.finish([server.url])
+    db = shark_history.connect(path)
+    d = shark_history.diff(db, server.url)
+    db.close()
+    assert [(r[0], r[1][0], r[2][0]) for r in d["changed"]] == [("admin", 200, 403)]
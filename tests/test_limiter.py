@@ -0,0 +1,40 @@
+import asyncio
+
+from shark_limiter import AdaptiveLimiter
+
+
+def test_timeouts_shrink_the_window_down_to_the_floor():
+    lim = AdaptiveLimiter(start=20, floor=5, interval=0, min_samples=4)
+    for _ in range(4):
+        lim.record(0.1, timeout=True)
+    assert lim.window == 14
+    for _ in range(5 * 4):
+        lim.record(0.1, timeout=True)
+    assert lim.window == 5
+
+
+def test_saturated_and_healthy_grows():
+    lim = AdaptiveLimiter(start=2, floor=1, ceiling=10, interval=0, min_samples=2, increase=3)
+
+    async def main():
+        async with lim:
+            async with lim:
+                lim.record(0.01, 200)
+                lim.record(0.01, 200)
+    asyncio.run(main())
+    assert lim.window == 5 and lim.inflight == 0
+
+
+def test_waiters_get_slots_in_order():
+    lim = AdaptiveLimiter(start=1, floor=1, ceiling=1)
+    order = []
+
+    async def job(n):
+        async with lim:
+            order.append(n)
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(*(job(n) for n in range(5)))
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3, 4] and lim.inflight == 0
@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import shark_checkpoint
+import shark_wordlist
+from shark_cache import DiskCache, SingleFlight
+from shark_checkpoint import Progress
+
+
+def test_wordlist_compiles_once_and_slices(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_text("/admin\nlogin\n\nadmin\nlogo.png\nconfig.php\n")
+    wl = shark_wordlist.load([str(src)], (".png",))
+    assert list(wl) == ["admin", "login", "config.php"]
+    assert wl[-1] == "config.php"
+    assert list(wl[1:]) == ["login", "config.php"]
+    compiled = os.listdir(os.path.join(os.environ["XDG_CACHE_HOME"], "sharkbuster", "wordlists"))
+    assert compiled == [wl.signature.hex() + ".sbw"]
+    again = shark_wordlist.Wordlist(wl.path)
+    assert list(again) == list(wl) and again.signature == wl.signature
+
+
+def test_progress_resumes_what_was_in_flight():
+    p = Progress()
+    for i in (0, 1, 3, 5):
+        p.finish(i)
+    assert p.low == 2 and p.completed == 4
+    q = Progress.from_state(p.state())
+    assert [i for i in range(7) if not q.skip(i)] == [2, 4, 6]
+    q.finish(2)
+    assert q.low == 4
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    path = shark_checkpoint.path_for("https://a.example/", "abc")
+    assert shark_checkpoint.load(path) is None
+    shark_checkpoint.save(path, {"progress": {"low": 3, "done": [5]}})
+    assert shark_checkpoint.load(path)["progress"] == {"low": 3, "done": [5]}
+    shark_checkpoint.remove(path)
+    assert shark_checkpoint.load(path) is None
+
+
+def test_single_flight_shares_concurrent_calls():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        kept = SingleFlight()
+        got = await asyncio.gather(*(kept.do("k", fetch) for _ in range(5)))
+        assert got == [1] * 5 and kept.calls == 1 and kept.shared == 4
+        assert await kept.do("k", fetch) == 1
+        fresh = SingleFlight(keep=False)
+        await fresh.do("k", fetch)
+        assert await fresh.do("k", fetch) == 3
+    asyncio.run(main())
+
+
+def test_disk_cache_persists_expires_and_evicts(tmp_path):
+    path = str(tmp_path / "c.json")
+    c = DiskCache(path, max_entries=2)
+    for k in ("a", "b", "c"):
+        c.put(k, {"v": k})
+    again = DiskCache(path, ttl=0)
+    assert len(again) == 2
+    assert again.get("a", stale=True) is None
+    assert again.get("c") is None
+    assert again.get("c", stale=True) == {"v": "c"}